@@ -0,0 +1,51 @@
+'''
+Measure memory used by WebGraph and CompactWebGraph holding a random web 
+graph: memory held after building the graph and the peak while building
+(and freezing) it.
+
+    $ python -m benchmarks.bench_graph -p 100000 -e 1000000
+'''
+import argparse
+import random
+import time
+import tracemalloc
+
+from crawlengine.compactgraph import CompactWebGraph
+from crawlengine.webpage import WebGraph, WebPage
+
+
+def build(graph, pages, edges, trace=False, seed=0):
+    rand = random.Random(seed)
+    pages = [WebPage("http://www.test.com/page/%d" % i, load_page=False) 
+                 for i in range(pages)]
+    relations = [(rand.choice(pages), rand.choice(pages)) 
+                     for _ in range(edges)]
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    for parent, page in relations:
+        graph.add_page(page, parent=parent)
+    if hasattr(graph, "freeze"):
+        graph.freeze()
+    elapsed = time.perf_counter() - start
+    memory, peak = tracemalloc.get_traced_memory() if trace else (0, 0)
+    tracemalloc.stop()
+    return memory, peak, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-p", "--pages", type=int, default=100000)
+    parser.add_argument("-e", "--edges", type=int, default=1000000)
+    parser.add_argument("--compact_only", action="store_true")
+    args = parser.parse_args()
+
+    graphs = [CompactWebGraph] 
+    if not args.compact_only:
+        graphs.append(WebGraph)
+    for graph in graphs:
+        *_, elapsed = build(graph(), args.pages, args.edges)
+        memory, peak, _ = build(graph(), args.pages, args.edges, trace=True)
+        print("%-16s %8.1f MB %8.1f MB peak %8.1f s" % (
+            graph.__name__, memory / 2**20, peak / 2**20, elapsed
+        ))
@@ -0,0 +1,33 @@
+'''
+Measure time of WebGraph.get_page and membership test for graphs of growing
+size. Time per lookup should not depend on the number of pages.
+
+    $ python -m benchmarks.bench_lookup
+'''
+import argparse
+import timeit
+
+from crawlengine.webpage import WebGraph
+
+
+def bench(size, number):
+    wg = WebGraph()
+    root = wg.add_page("http://www.test.com/")
+    for i in range(size):
+        wg.add_page("http://www.test.com/page/%d" % i, parent=root)
+    url = "http://www.test.com/page/%d" % (size // 2)
+    get_page = timeit.timeit(lambda: wg.get_page(url), number=number)
+    contains = timeit.timeit(lambda: url in wg, number=number)
+    return get_page / number, contains / number
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=10000,
+                        help="number of lookups for every size")
+    args = parser.parse_args()
+
+    print("%10s %14s %14s" % ("pages", "get_page [us]", "in [us]"))
+    for size in (1000, 10000, 100000):
+        get_page, contains = bench(size, args.number)
+        print("%10d %14.2f %14.2f" % (size, get_page * 1e6, contains * 1e6))
@@ -0,0 +1,50 @@
+'''
+Measure memory used by the seen-set of the frontier: exact set of urls and
+Bloom filters with different false positive rates. Urls which have never 
+been added are used to measure the actual false positive rate.
+
+    $ python -m benchmarks.bench_seen -n 1000000
+'''
+import argparse
+import time
+import tracemalloc
+from functools import partial
+
+from crawlengine.bloom import ScalableBloomFilter
+
+
+def fill(seen, count):
+    for i in range(count):
+        seen.add("http://www.test.com/page/%d?sort=asc" % i)
+    return seen
+
+
+def bench(factory, count):
+    start = time.perf_counter()
+    fill(factory(), count)
+    elapsed = time.perf_counter() - start # tracemalloc slows down adding
+    tracemalloc.start()
+    seen = fill(factory(), count)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    probes = 100000
+    positives = sum("http://www.other.com/page/%d" % i in seen
+                        for i in range(probes))
+    return memory, elapsed, positives / probes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=1000000,
+                        help="number of urls")
+    args = parser.parse_args()
+
+    print("%-24s %10s %10s %10s" % ("seen-set", "MB", "s", "fp rate"))
+    factories = [("set", set)] + [
+        ("bloom %g" % rate, partial(ScalableBloomFilter, error_rate=rate))
+            for rate in (0.01, 0.001, 0.0001)
+    ]
+    for name, factory in factories:
+        memory, elapsed, fp_rate = bench(factory, args.number)
+        print("%-24s %10.1f %10.1f %10.5f" % (name, memory / 2**20, elapsed,
+                                              fp_rate))
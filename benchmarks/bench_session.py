@@ -0,0 +1,60 @@
+'''
+Compare fetching pages with module-level requests.get (new connection per 
+request) against the pooled session shared by SearchManager workers.
+
+    $ python -m benchmarks.bench_session -n 500 -w 8
+'''
+import argparse
+import threading
+import time
+from concurrent import futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crawlengine.crawler import create_session
+from crawlengine.webpage import WebPage
+
+
+BODY = b"<html><body><a href='/next'>next</a> bench@test.com</body></html>"
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(url, n, max_workers, session=None):
+    start = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers) as executor:
+        pages = [WebPage("%s/%d" % (url, i), load_page=False) 
+                     for i in range(n)]
+        list(executor.map(lambda page: page.reload(session=session), pages))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--requests", type=int, default=500)
+    parser.add_argument("-w", "--max_workers", type=int, default=8)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d" % server.server_address[1]
+
+    plain = run(url, args.requests, args.max_workers)
+    pooled = run(url, args.requests, args.max_workers, 
+                 create_session(args.max_workers))
+    server.shutdown()
+
+    print("requests.get:   %.3fs (%.0f req/s)" % (plain, args.requests/plain))
+    print("pooled session: %.3fs (%.0f req/s)" % (pooled, args.requests/pooled))
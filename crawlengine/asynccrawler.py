@@ -0,0 +1,235 @@
+import asyncio
+import itertools
+from concurrent import futures
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from crawlengine.crawler import SearchManager, SearchResult, Seed, \
+    RETRY_STATUS_CODES, retry_delay
+from crawlengine.scheduler import THROTTLE_STATUS_CODES
+
+
+# Errors worth asking for the page again
+if aiohttp is None:
+    RETRY_EXCEPTIONS = (asyncio.TimeoutError,)
+else:
+    RETRY_EXCEPTIONS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class AsyncSearchManager(SearchManager):
+    '''
+    Crawler running all http requests on a single event loop. Pages are 
+    downloaded with aiohttp and searched in a pool of parse_workers processes
+    (or in a thread when parse_workers is not set), so parsing does not block
+    the loop.
+    '''
+
+    def __init__(self, max_workers=100, **kwargs):
+        super().__init__(max_workers=max_workers, **kwargs)
+
+    def _create_session(self):
+        # aiohttp.ClientSession has to be created inside running loop
+        return None
+
+    def _open_session(self):
+        if aiohttp is None:
+            raise RuntimeError("asynchronous engine requires aiohttp")
+        connector = aiohttp.TCPConnector(
+            limit=self.max_workers, 
+            limit_per_host=self.max_host_connections or 0
+        )
+        return aiohttp.ClientSession(connector=connector)
+
+    def _request_options(self):
+        options = super()._request_options()
+        timeout = options.pop("timeout")
+        if aiohttp is not None and timeout:
+            connect, read = timeout
+            options["timeout"] = aiohttp.ClientTimeout(sock_connect=connect, 
+                                                       sock_read=read)
+        return options
+
+    async def _fetch(self, page, session):
+        '''
+        Download the page. Connection errors, timeouts and 5xx responses are
+        retried up to retries times, except throttling responses (503), which
+        are re-queued through the scheduler (see _downloaded).
+        '''
+        for attempt in itertools.count():
+            try:
+                await page.areload(session, **self._request_options())
+            except RETRY_EXCEPTIONS:
+                if attempt >= self.retries:
+                    raise
+            else:
+                if attempt >= self.retries or \
+                        page.status_code not in RETRY_STATUS_CODES or \
+                        page.status_code in THROTTLE_STATUS_CODES:
+                    return page
+            await asyncio.sleep(retry_delay(attempt, self.retry_backoff))
+
+    async def _download(self, page, session):
+        await self._fetch(page, session)
+        if self.dedup is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._fingerprint, page
+            )
+        return page
+
+    def _submit_worker(self, page, session):
+        task = asyncio.ensure_future(self._download(page, session))
+        if self.callback:
+            task.add_done_callback(self.callback)
+        return task
+
+    def _iter_run(self):
+        '''
+        Drive the event loop only while results are consumed. On CTRL+C the
+        crawl is cancelled: results of pages already downloaded are kept and
+        sinks & checkpoint are flushed.
+        '''
+        loop = asyncio.new_event_loop()
+        results = self._aiter_run()
+        task = None
+        try:
+            while True:
+                task = loop.create_task(results.__anext__())
+                try:
+                    yield loop.run_until_complete(task)
+                except StopAsyncIteration:
+                    break
+        except KeyboardInterrupt:
+            if task is not None: # None when interrupted before the start
+                task.cancel()
+                while not task.done():
+                    try:
+                        loop.run_until_complete(
+                            asyncio.gather(task, return_exceptions=True)
+                        )
+                    except KeyboardInterrupt:
+                        pass # raised by one more download, keep cancelling
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
+
+    async def asearch(self, root_page, max_depth, within_domain=True, 
+                      budget=None):
+        async for _ in self.aiter_search(root_page, max_depth, within_domain,
+                                         budget):
+            pass
+
+    async def aiter_search(self, root_page, max_depth, within_domain=True,
+                           budget=None):
+        '''
+        Asynchronous generator version of search yielding SearchResult of 
+        every page as soon as the page is searched.
+        '''
+        self._start([Seed(root_page, max_depth, within_domain)], budget)
+        results = self._aiter_run()
+        try:
+            async for _, result in results:
+                yield result
+        finally:
+            await results.aclose()
+
+    async def asearch_many(self, seeds, max_depth=0, within_domain=True,
+                           budget=None):
+        async for _ in self.aiter_search_many(seeds, max_depth, within_domain,
+                                              budget):
+            pass
+
+    async def aiter_search_many(self, seeds, max_depth=0, within_domain=True,
+                                budget=None):
+        '''
+        Asynchronous generator version of iter_search_many yielding tuples
+        (seed, SearchResult).
+        '''
+        self._start(self._as_seeds(seeds, max_depth, within_domain), budget)
+        results = self._aiter_run()
+        try:
+            async for item in results:
+                yield item
+        finally:
+            await results.aclose()
+
+    async def _aiter_run(self):
+        try:
+            if self.session:
+                async for item in self._crawl(self.session):
+                    yield item
+            else:
+                async with self._open_session() as session:
+                    async for item in self._crawl(session):
+                        yield item
+        finally:
+            self._flush()
+
+    async def _crawl(self, session):
+        downloads = dict()
+        searches = dict()
+
+        parsers = self._create_parser_pool() or futures.ThreadPoolExecutor(1)
+        with parsers:
+            try:
+                while True:
+                    # Pages waiting for parser also occupy workers (backpressure)
+                    while len(downloads) + len(searches) < self.max_workers:
+                        page = self._next_page()
+                        if page is None:
+                            break
+                        downloads[self._submit_worker(page, session)] = page
+
+                    if not downloads and not searches:
+                        if not self.scheduler or self.stopped:
+                            break
+                        await asyncio.sleep(self.scheduler.delay() or 0)
+                        continue
+
+                    done, _ = await asyncio.wait(
+                        list(downloads) + list(searches), 
+                        timeout=self._wait_timeout(len(downloads) + len(searches)),
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+
+                    for future in done:
+                        if future in downloads:
+                            page = downloads.pop(future)
+                            if not self._downloaded(page, future):
+                                continue
+                            known = self._known_result(page)
+                            if known:
+                                pages, result = self._merge_result(known)
+                                yield self._schedule(page, pages, result), result
+                                continue
+                            search = self._submit_search(page, parsers)
+                            searches[asyncio.wrap_future(search)] = page
+                        else:
+                            page = searches.pop(future)
+                            if future.exception():
+                                self._search_failed(page, future.exception())
+                                continue
+                            pages, result = self._merge_result(
+                                SearchResult(page, *future.result())
+                            )
+                            yield self._schedule(page, pages, result), result
+            except (asyncio.CancelledError, KeyboardInterrupt):
+                # Keep results of pages already downloaded or searched
+                for future, page in downloads.items():
+                    if self._succeeded(future):
+                        self._update_internals(page)
+                for future, page in searches.items():
+                    if self._succeeded(future):
+                        self._merge_result(SearchResult(page, *future.result()))
+                raise
+            finally:
+                for future in downloads:
+                    future.cancel()
+                await asyncio.gather(*downloads, return_exceptions=True)
+
+    @staticmethod
+    def _succeeded(future):
+        return future.done() and not future.cancelled() and \
+            future.exception() is None
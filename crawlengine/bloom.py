@@ -0,0 +1,127 @@
+import hashlib
+import math
+import struct
+
+
+MAX_HASHES = 16
+HASHES = struct.Struct("<%dI" % MAX_HASHES)
+
+
+def hashes(item):
+    '''Returns MAX_HASHES independent 32-bit hashes of the string.'''
+    return HASHES.unpack(hashlib.blake2b(
+        item.encode("utf-8", "surrogatepass"), digest_size=HASHES.size
+    ).digest())
+
+
+class BloomFilter:
+    '''
+    Set of strings with fixed memory usage: capacity items are stored in
+    bit array of size chosen for the false positive rate error_rate (e.g.
+    1M items with error_rate 0.001 take 1.8 MB). Membership test may
+    answer True for an item never added (with probability error_rate), but
+    never answers False for an added one. Items cannot be removed.
+    '''
+
+    def __init__(self, capacity, error_rate=0.001):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate has to be between 0 and 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Optimal number of hash functions is -log2(error_rate), bit array
+        # is made bigger when there are less of them
+        self.nhashes = min(MAX_HASHES, max(1, round(-math.log2(error_rate))))
+        self.nbits = max(8, math.ceil(
+            -self.nhashes * capacity
+            / math.log(1 - error_rate ** (1 / self.nhashes))
+        ))
+        if self.nbits > 2 ** 32:
+            raise ValueError("capacity too big for single filter")
+        self._bits = bytearray((self.nbits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, item_hashes):
+        nbits = self.nbits
+        return [value % nbits for value in item_hashes[:self.nhashes]]
+
+    def add(self, item, _hashes=None):
+        '''Add item to the set. Returns False when item was (probably) in.'''
+        bits, new = self._bits, False
+        for pos in self._positions(_hashes or hashes(item)):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                new = True
+        if new:
+            self._count += 1
+        return new
+
+    def contains(self, item, _hashes=None):
+        bits = self._bits
+        for pos in self._positions(_hashes or hashes(item)):
+            if not bits[pos >> 3] & 1 << (pos & 7):
+                return False
+        return True
+
+    def __contains__(self, item):
+        return self.contains(item)
+
+    def __len__(self):
+        '''Number of added items (items taken as present are not counted).'''
+        return self._count
+
+    @property
+    def full(self):
+        return self._count >= self.capacity
+
+    @property
+    def nbytes(self):
+        return len(self._bits)
+
+
+class ScalableBloomFilter:
+    '''
+    Bloom filter growing with the number of items: when the current filter
+    is full, a new one growth times bigger and with error rate multiplied
+    by tightening is added, so the total false positive rate stays below
+    error_rate however many items are added.
+    '''
+
+    def __init__(self, initial_capacity=100000, error_rate=0.001, growth=2,
+                 tightening=0.5):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self._filters = [
+            BloomFilter(initial_capacity, error_rate * (1 - tightening))
+        ]
+
+    def add(self, item):
+        '''Add item to the set. Returns False when item was (probably) in.'''
+        item_hashes = hashes(item)
+        *filled, current = self._filters
+        for bloom in filled:
+            if bloom.contains(item, item_hashes):
+                return False
+        if current.full:
+            if current.contains(item, item_hashes):
+                return False
+            current = BloomFilter(current.capacity * self.growth,
+                                  current.error_rate * self.tightening)
+            self._filters.append(current)
+        return current.add(item, item_hashes)
+
+    def _contains(self, item, item_hashes):
+        return any(bloom.contains(item, item_hashes)
+                       for bloom in reversed(self._filters))
+
+    def __contains__(self, item):
+        return self._contains(item, hashes(item))
+
+    def __len__(self):
+        return sum(len(bloom) for bloom in self._filters)
+
+    @property
+    def nbytes(self):
+        return sum(bloom.nbytes for bloom in self._filters)
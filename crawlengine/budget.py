@@ -0,0 +1,59 @@
+import time
+import urllib.parse as urlparse
+from collections import Counter
+
+
+class Budget:
+    '''
+    Limits of the cost of one search: number of downloaded pages
+    (max_pages), bytes of downloaded content (max_bytes), seconds since the
+    start of the search (max_time) and number of pages downloaded from one
+    host (max_host_pages). None means no limit. When the budget is exhausted
+    the search stops downloading new pages, but pages being downloaded are
+    still searched, so max_bytes and max_time may be slightly exceeded.
+    '''
+
+    def __init__(self, max_pages=None, max_bytes=None, max_time=None,
+                 max_host_pages=None, clock=time.monotonic):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.max_time = max_time
+        self.max_host_pages = max_host_pages
+        self.clock = clock
+        self.pages = 0
+        self.bytes = 0
+        self.host_pages = Counter()
+        self.started = None
+
+    def start(self):
+        self.started = self.clock()
+
+    @property
+    def elapsed(self):
+        return self.clock() - self.started if self.started is not None \
+                   else 0.0
+
+    def charge(self, page):
+        '''
+        Count download of the page. Returns False when the host of the page
+        has used up its budget (next pages of the host must not be
+        downloaded).
+        '''
+        host = urlparse.urlsplit(page.url).netloc
+        self.pages += 1
+        self.host_pages[host] += 1
+        return not self.max_host_pages or \
+            self.host_pages[host] < self.max_host_pages
+
+    def received(self, nbytes):
+        self.bytes += nbytes
+
+    def exhausted(self):
+        '''Returns name of the exhausted limit or None.'''
+        if self.max_pages is not None and self.pages >= self.max_pages:
+            return "max pages"
+        if self.max_bytes is not None and self.bytes >= self.max_bytes:
+            return "max bytes"
+        if self.max_time is not None and self.elapsed >= self.max_time:
+            return "max time"
+        return None
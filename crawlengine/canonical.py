@@ -0,0 +1,78 @@
+import fnmatch
+import re
+import urllib.parse as urlparse
+
+import crawlengine.util as util
+
+
+# Query parameters identifying visitor or session, not the content of the page
+# (glob patterns, case insensitive).
+STRIP_PARAMS = (
+    "utm_*", "fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid",
+    "mc_eid", "_ga", "_hsenc", "_hsmi", "sid", "sessionid", "session_id",
+    "phpsessid", "jsessionid", "aspsessionid*", "cfid", "cftoken"
+)
+
+# Session id embedded in path, e.g. /page;jsessionid=0123
+RE_PATH_SESSION = re.compile(r";(?:jsessionid|phpsessid|sid)=[^/]*",
+                             re.IGNORECASE)
+
+
+class Canonicalizer:
+    '''
+    Turns url into canonical form, so urls of the same page are not visited
+    many times. On top of util.normalize_url (lowercase host, no default
+    port, no anchor) it removes session ids from path and query parameters
+    matching strip_params (when keep_params is given, all parameters not
+    matching keep_params are removed), sorts the parameters (sort_query)
+    and strips or adds trailing slash of path (trailing_slash "strip" or
+    "add"; None keeps path as it is). Instances are callables url -> url.
+    '''
+
+    def __init__(self, strip_params=STRIP_PARAMS, keep_params=None,
+                 sort_query=True, trailing_slash=None):
+        if trailing_slash not in (None, "strip", "add"):
+            raise ValueError("trailing_slash has to be 'strip', 'add' or None")
+        self.strip_params = [item.lower() for item in strip_params or ()]
+        self.keep_params = keep_params and \
+                               [item.lower() for item in keep_params]
+        self.sort_query = sort_query
+        self.trailing_slash = trailing_slash
+
+    def _matches(self, name, patterns):
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+    def _keep(self, param):
+        name = urlparse.unquote_plus(param.partition("=")[0]).lower()
+        if self.keep_params is not None:
+            return self._matches(name, self.keep_params)
+        return not self._matches(name, self.strip_params)
+
+    def _path(self, path):
+        if self.trailing_slash == "strip" and path != "/":
+            path = path.rstrip("/") or "/"
+        elif self.trailing_slash == "add" and not path.endswith("/") and \
+                "." not in path.rsplit("/", 1)[-1]:
+            path += "/"
+        return path
+
+    def _query(self, qs):
+        # Parameters are compared & kept in their original encoding
+        params = [param for param in qs.split("&") if param and
+                                                      self._keep(param)]
+        if self.sort_query:
+            params.sort()
+        return "&".join(params)
+
+    def __call__(self, url):
+        # Session ids have to be removed before path is quoted
+        scheme, netloc, path, qs, _ = urlparse.urlsplit(url)
+        url = urlparse.urlunsplit(
+            (scheme, netloc, RE_PATH_SESSION.sub("", path), qs, None)
+        )
+        scheme, netloc, path, qs, _ = urlparse.urlsplit(
+            util.normalize_url(url)
+        )
+        return urlparse.urlunsplit(
+            (scheme, netloc, self._path(path), self._query(qs), None)
+        )
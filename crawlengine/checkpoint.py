@@ -0,0 +1,94 @@
+import json
+import os
+import time
+from collections import namedtuple
+
+
+CrawlState = namedtuple("CrawlState", "root_url max_depth within_domain seen "
+                                      "results")
+
+
+class Checkpoint:
+    '''
+    Journal of the crawl kept in a directory. Parameters of the search are
+    saved in meta.json, the progress is appended to journal.jsonl: one line
+    for every discovered page (url, depth) and one for every searched page
+    (url, found urls, found emails). Lines are buffered and written every
+    flush_interval seconds, so checkpointing does not slow down the crawl.
+    '''
+
+    META = "meta.json"
+    JOURNAL = "journal.jsonl"
+
+    def __init__(self, path, flush_interval=5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._buffer = list()
+        self._last_flush = time.monotonic()
+        self._journal = None
+
+    def start(self, root_url, max_depth, within_domain=True):
+        '''Start new journal of the search, discarding the previous one.'''
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, self.META), "w") as metafile:
+            json.dump(dict(root_url=root_url, max_depth=max_depth,
+                           within_domain=within_domain), metafile)
+        self.close()
+        self._buffer = list()
+        self._journal = open(os.path.join(self.path, self.JOURNAL), "w")
+
+    def load(self):
+        '''
+        Read state of the search saved in the directory and open journal for
+        appending. Returns CrawlState.
+        '''
+        with open(os.path.join(self.path, self.META)) as metafile:
+            meta = json.load(metafile)
+
+        seen, results = list(), list()
+        path = os.path.join(self.path, self.JOURNAL)
+        line = "\n"
+        if os.path.exists(path):
+            with open(path) as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue # line cut off by crash
+                    if record[0] == "S":
+                        seen.append(tuple(record[1:]))
+                    else:
+                        results.append(tuple(record[1:]))
+
+        self.close()
+        self._journal = open(path, "a")
+        if not line.endswith("\n"):
+            self._journal.write("\n")
+        return CrawlState(seen=seen, results=results, **meta)
+
+    def seen(self, url, depth):
+        '''Record page discovered at given depth.'''
+        self._append(("S", url, depth))
+
+    def searched(self, url, urls, emails):
+        '''Record result of searching the page.'''
+        self._append(("R", url, list(urls), list(emails)))
+
+    def _append(self, record):
+        self._buffer.append(json.dumps(record, separators=(",", ":")))
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        '''Write buffered records to the journal.'''
+        if self._buffer and self._journal:
+            self._journal.write("\n".join(self._buffer) + "\n")
+            self._journal.flush()
+        self._buffer = list()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._journal:
+            self.flush()
+            self._journal.close()
+            self._journal = None
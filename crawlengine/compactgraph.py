@@ -0,0 +1,270 @@
+from array import array
+from collections import deque
+from itertools import accumulate
+import csv
+
+from crawlengine.webpage import WebPage
+import crawlengine.util as util
+
+
+class CompactWebGraph:
+    '''
+    Memory efficient alternative to WebGraph with the same interface. Urls
+    are interned to integer ids and relations are kept in arrays of ids. New
+    relations are appended to a log and merged into compressed sparse row
+    (CSR) arrays when the graph is queried (or freeze is called).
+    '''
+
+    def __init__(self):
+        self._ids = dict()
+        self._urls = list()
+        self.aliases = dict() # url -> id of page with the same content
+
+        # Relations added since the last freeze
+        self._src = array("i")
+        self._dst = array("i")
+
+        # CSR: targets of the page with id i are
+        # targets[offsets[i]:offsets[i+1]]
+        self._offsets = array("q", [0])
+        self._targets = array("i")
+
+        # CSR of reversed relations, built on demand
+        self._reversed = None
+
+    def _intern(self, obj):
+        '''Returns id of the page/url, adds the page when necessary.'''
+        url = obj.url if isinstance(obj, WebPage) else util.normalize_url(obj)
+        node = self._ids.get(url)
+        if node is None:
+            node = self._ids[url] = len(self._urls)
+            self._urls.append(url)
+        return node
+
+    def _id(self, obj):
+        url = obj.url if isinstance(obj, WebPage) else util.normalize_url(obj)
+        return self._ids.get(url)
+
+    def _page(self, node):
+        return WebPage(url=self._urls[node], load_page=False)
+
+    def freeze(self):
+        '''
+        Merge relations added since the last call into CSR arrays. Old rows
+        and new relations are bucketed by source with counting sort, so no
+        per-edge Python objects are kept while merging.
+        '''
+        count = len(self._urls)
+        if not self._src and len(self._offsets) == count + 1:
+            return
+
+        old_offsets, old_targets = self._offsets, self._targets
+        old_count = len(old_offsets) - 1
+
+        # Length of every row: old relations + relations added since
+        counts = array("q", bytes(8 * (count + 1)))
+        for node in range(old_count):
+            counts[node+1] = old_offsets[node+1] - old_offsets[node]
+        for src in self._src:
+            counts[src+1] += 1
+        starts = array("q", accumulate(counts))
+        del counts
+
+        merged = array("i", bytes(4 * starts[-1]))
+        positions = array("q", starts)
+        for node in range(old_count):
+            start, end = old_offsets[node], old_offsets[node+1]
+            merged[positions[node]:positions[node] + end - start] = \
+                old_targets[start:end]
+            positions[node] += end - start
+        for src, dst in zip(self._src, self._dst):
+            merged[positions[src]] = dst
+            positions[src] += 1
+        del positions
+        self._src, self._dst = array("i"), array("i")
+        self._offsets, self._targets = array("q", [0]), array("i")
+        del old_targets
+
+        # Sort rows with new relations and drop duplicates, compacting the
+        # array in place (rows only move to the left)
+        offsets, size = array("q", [0]), 0
+        for node in range(count):
+            start, end = starts[node], starts[node+1]
+            old_length = old_offsets[node+1] - old_offsets[node] \
+                             if node < old_count else 0
+            row = merged[start:end]
+            if end - start != old_length: # old rows are sorted & unique
+                row = array("i", sorted(set(row)))
+            merged[size:size + len(row)] = row
+            size += len(row)
+            offsets.append(size)
+        del merged[size:]
+
+        self._offsets, self._targets = offsets, merged
+        self._reversed = None
+
+    def _neighbours(self, node):
+        return self._targets[self._offsets[node]:self._offsets[node+1]]
+
+    def _referrers(self, node):
+        '''Returns ids of pages referring to the page.'''
+        if self._reversed is None:
+            counts = [0] * len(self._offsets)
+            for target in self._targets:
+                counts[target+1] += 1
+            offsets = array("q", accumulate(counts))
+            targets = array("i", bytes(4 * len(self._targets)))
+            positions = list(offsets)
+            for src in range(len(self._offsets) - 1):
+                for target in self._neighbours(src):
+                    targets[positions[target]] = src
+                    positions[target] += 1
+            self._reversed = (offsets, targets)
+
+        offsets, targets = self._reversed
+        return targets[offsets[node]:offsets[node+1]]
+
+    def add_relation(self, p1, p2, directed=True):
+        '''Add relation between pages to graph.'''
+        id1, id2 = self._intern(p1), self._intern(p2)
+        self._src.append(id1)
+        self._dst.append(id2)
+        if not directed:
+            self._src.append(id2)
+            self._dst.append(id1)
+
+    def add_page(self, obj, parent=None):
+        '''
+        Adds page to graph. Accepts WebPage or url(string).
+        '''
+        if not isinstance(obj, WebPage):
+            obj = WebPage(url=util.normalize_url(obj), load_page=False)
+        self._intern(obj)
+        if parent:
+            self.add_relation(parent, obj)
+        return obj
+
+    def add_alias(self, alias, page):
+        '''
+        Record that alias (page or url) refers to the page, e.g. because it 
+        has the same content. From now on the url of alias resolves to the 
+        page.
+        '''
+        url = alias.url if isinstance(alias, WebPage) \
+                  else util.normalize_url(alias)
+        node = self._intern(page)
+        if url != self._urls[node]:
+            self.aliases[url] = node
+            self._ids[url] = node
+
+    def get_page(self, url, create_new=True):
+        '''
+        Returns page with given url or creates new one if there is no page
+        with the url.
+        '''
+        node = self._id(url)
+        if node is not None:
+            return self._page(node)
+        if create_new:
+            if isinstance(url, WebPage):
+                url = url.url
+            return WebPage(url=util.normalize_url(url), load_page=False)
+
+    def find_nearest_neighbours(self, page, max_dist, with_dist=True):
+        '''
+        Searches for the neighbours of the page within defined distance. Returns
+        list of tuples (page, distance).
+        '''
+        start = self._id(page)
+        if start is None:
+            return None
+        self.freeze()
+
+        dists = { start: 0 }
+        queue = deque((start,))
+        while queue:
+            current = queue.popleft()
+            dist = dists[current] + 1
+            if dist > max_dist:
+                continue
+            for node in self._neighbours(current):
+                if node not in dists:
+                    dists[node] = dist
+                    queue.append(node)
+        del dists[start]
+
+        if with_dist:
+            return [(self._page(node), dist) for node, dist in dists.items()]
+        else:
+            return [self._page(node) for node in dists]
+
+    def find_path(self, pstart, pend):
+        '''
+        Searches for the shorthest path between two pages. Returns tuple containing
+        consequtive pages in the path or None if there is not path.
+        '''
+        start, end = self._id(pstart), self._id(pend)
+        if start is None or end is None:
+            return None
+        self.freeze()
+
+        # Test whether the pages are directly connected
+        if end in self._neighbours(start):
+            return (self._page(start), self._page(end))
+
+        path = util.shortest_path(start, end, self._neighbours, 
+                                  self._referrers)
+        if not path or len(path) < 2:
+            return None
+        return tuple(self._page(node) for node in path)
+
+    def find_paths(self, pstart, targets):
+        '''
+        Searches for the shortest paths from one page to many target pages in
+        a single sweep through the graph. Returns dict target -> tuple of 
+        consequtive pages in the path (or None if there is no path).
+        '''
+        targets = [target if isinstance(target, WebPage) 
+                       else self.get_page(target) for target in targets]
+        start = self._id(pstart)
+        if start is None:
+            return { target: None for target in targets }
+        self.freeze()
+
+        ids = { target: self._id(target) for target in targets }
+        paths = util.shortest_paths(
+            start, [node for node in ids.values() if node is not None], 
+            self._neighbours
+        )
+        return { 
+            target: paths.get(node) and 
+                        tuple(self._page(item) for item in paths[node]) 
+            for target, node in ids.items() 
+        }
+
+    def __contains__(self, page):
+        return self._id(page) is not None
+
+    def __iter__(self):
+        return (self._page(node) for node in range(len(self._urls)))
+
+    def __getitem__(self, page):
+        node = self._id(page)
+        if node is None:
+            raise KeyError(page)
+        self.freeze()
+        return set(self._page(target) for target in self._neighbours(node))
+
+    def __len__(self):
+        return len(self._urls)
+
+    def save_to_csv(self, path):
+        '''Save graph to csv file.'''
+        self.freeze()
+        with open(path, "w", newline="") as csvfile:
+            writer = csv.writer(csvfile, delimiter=";", quotechar="|",
+                                quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(("from", "to"))
+            for node, url in enumerate(self._urls):
+                for target in self._neighbours(node):
+                    writer.writerow((url, self._urls[target]))
@@ -1,19 +1,38 @@
 from concurrent import futures
-from collections import namedtuple
+from collections import namedtuple, deque
 import urllib.parse as urlparse
 import requests
 import pdb
 import csv
+import time
+import random
+import itertools
+import heapq
 import operator
 from functools import reduce
 
-from requests.exceptions import RequestException
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, ConnectionError, Timeout, \
+    ChunkedEncodingError
 
-from crawlengine.webpage import find_urls, find_emails, WebPage, WebGraph
+from crawlengine.webpage import extract, WebPage, WebGraph
+import crawlengine.util as util
 from crawlengine.util import url_fix, fmap
+from crawlengine.scheduler import HostScheduler, retry_after, \
+    THROTTLE_STATUS_CODES
+from crawlengine.bloom import ScalableBloomFilter
+from crawlengine.priority import Link
+from crawlengine.budget import Budget
 
 
-SearchResult = namedtuple("SearchResult", "page urls emails")
+# anchors: dict url -> anchor text (only when needed for scoring of urls)
+SearchResult = namedtuple("SearchResult", "page urls emails anchors", 
+                          defaults=(None,))
+
+# Errors and responses worth asking for the page again
+RETRY_EXCEPTIONS = (ConnectionError, Timeout, ChunkedEncodingError)
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+MAX_RETRY_DELAY = 30.0
 
 
 def update_netloc(root_url, url):
@@ -27,32 +46,268 @@ def update_netloc(root_url, url):
     return url
 
 
-def search_webpage(page):
+def search_content(url, content_type, content, encoding=None, 
+                   parser="html.parser", anchors=False):
+    '''
+    Search content of the page with given url for emails and urls. Works on
+    raw data only, so can be run in other process. Returns tuple 
+    (urls, emails) or (urls, emails, anchors) with anchors.
+    '''
+    if not (content_type and content_type.startswith("text")):
+        return (list(), list(), dict()) if anchors else (list(), list())
+
+    urls, emails, *texts = extract(content, encoding, parser=parser, 
+                                   anchors=anchors)
+    urls = [update_netloc(url, item) for item in urls]
+    if anchors:
+        return urls, emails, { update_netloc(url, item): text
+                                   for item, text in texts[0].items() }
+    return urls, emails
+
+
+def search_webpage(page, parser="html.parser", anchors=False):
     '''Search webpage for emails and urls. Returns dict with found items.'''
     if not page.loaded:
         raise ValueError("empty WebPage object, reload required")
 
-    content_type = page.headers.get("Content-Type", None)
-    if not (content_type and content_type.startswith("text")):
-        return SearchResult(page=page, urls=list(), emails=list())
+    return SearchResult(page, *search_content(*_content_of(page), 
+                                              parser=parser, anchors=anchors))
+
+
+def _content_of(page):
+    return (page.url, page.headers.get("Content-Type", None), page.content,
+            getattr(page, "encoding", None))
+
+
+def _base_url(url):
+    '''Returns url which relative links of the page are resolved against.'''
+    return urlparse.urljoin(url, ".")
+
+
+def retry_delay(attempt, backoff=0.5):
+    '''
+    Returns number of seconds to wait before next attempt: exponential 
+    backoff with random jitter (so workers do not retry all at once).
+    '''
+    delay = backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+    return min(delay, MAX_RETRY_DELAY)
+
+
+def create_session(max_workers=1, max_host_connections=None):
+    '''
+    Create requests.Session with connection pool shared by all workers. Pool 
+    keeps alive up to max_host_connections (defaults to max_workers) 
+    connections to every host.
+    '''
+    max_host_connections = max_host_connections or max_workers
+    adapter = HTTPAdapter(
+        pool_connections=max(10, max_workers),
+        pool_maxsize=max_host_connections,
+        pool_block=True
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class Frontier:
+    '''
+    Pages waiting to be visited. Remembers depth of every page at the moment
+    it was discovered (and seed of the search it was discovered by) and 
+    hands pages out in BFS order. Urls of all the pages ever added are kept
+    in seen (set by default; a probabilistic set like ScalableBloomFilter 
+    takes a fraction of memory for the price of skipping some pages). Depth
+    and seed are kept only for pages waiting or being visited (until done 
+    is called).
+    '''
+
+    def __init__(self, seen=None):
+        self._queue = deque() # (page, depth, seed)
+        self._seen = seen if seen is not None else set()
+        self._depths = dict() # page -> depth of pages being visited
+        self._seeds = dict()  # page -> seed of pages being visited
+
+    def add(self, page, depth, visit=True, score=0, seed=None):
+        '''
+        Add page to the frontier. Returns False when page was seen before. 
+        Page added with visit=False is only remembered as seen. Score is 
+        ignored (see PriorityFrontier).
+        '''
+        if page.url in self._seen:
+            return False
+        self._seen.add(page.url)
+        if visit:
+            self._push(page, depth, score, seed)
+        return True
+
+    def _push(self, page, depth, score, seed):
+        self._queue.append((page, depth, seed))
+
+    def pop(self):
+        '''Remove and return the shallowest page waiting to be visited.'''
+        page, depth, seed = self._queue.popleft()
+        self._visit(page, depth, seed)
+        return page
+
+    def _visit(self, page, depth, seed):
+        self._depths[page] = depth
+        if seed is not None:
+            self._seeds[page] = seed
+
+    def depth(self, page):
+        '''Returns depth of the page being visited.'''
+        return self._depths[page]
+
+    def seed(self, page):
+        '''Returns seed of the page being visited.'''
+        return self._seeds.get(page)
+
+    def score(self, page):
+        '''Returns score of the page being visited.'''
+        return 0
+
+    def done(self, page):
+        '''Forget depth and seed of the visited page.'''
+        self._depths.pop(page, None)
+        self._seeds.pop(page, None)
+
+    def __contains__(self, page):
+        return page.url in self._seen
+
+    def __len__(self):
+        return len(self._queue)
+
+
+class PriorityFrontier(Frontier):
+    '''
+    Frontier handing out pages with the highest score first (best-first 
+    search). Pages with equal scores are handed out in order of adding.
+    '''
+
+    def __init__(self, seen=None):
+        super().__init__(seen)
+        self._queue = list() # heap of (-score, order, page, depth, seed)
+        self._counter = itertools.count()
+        self._scores = dict() # page -> score of pages being visited
+
+    def _push(self, page, depth, score, seed):
+        heapq.heappush(self._queue, 
+                       (-score, next(self._counter), page, depth, seed))
+
+    def pop(self):
+        '''Remove and return the best page waiting to be visited.'''
+        score, _, page, depth, seed = heapq.heappop(self._queue)
+        self._visit(page, depth, seed)
+        self._scores[page] = -score
+        return page
+
+    def score(self, page):
+        return self._scores.get(page, 0)
+
+    def done(self, page):
+        super().done(page)
+        self._scores.pop(page, None)
+
+
+class Seed:
+    '''
+    Root page of a search with its parameters (max_depth, within_domain). 
+    SearchManager can run searches of many seeds at once (see 
+    iter_search_many); results of pages found from the seed are collected in
+    its partition: number of searched pages and found emails.
+    '''
+
+    def __init__(self, page, max_depth=0, within_domain=True):
+        if not isinstance(page, WebPage):
+            page = WebPage(page, load_page=False)
+        self.page = page
+        self.max_depth = max_depth
+        self.within_domain = within_domain
+        self.filters = list() # set by SearchManager at the start
+        self.pages = 0
+        self.emails = set()
 
-    urls = [update_netloc(page.url, url) for url in find_urls(page)]
-    emails = find_emails(page)
-    return SearchResult(page=page, urls=urls, emails=emails)
+    @property
+    def url(self):
+        return self.page.url
+
+    def add(self, result):
+        '''Add search result of the page to the partition of the seed.'''
+        self.pages += 1
+        self.emails.update(result.emails)
+
+    def __repr__(self):
+        return "Seed(url={!r}, max_depth={!r})".format(self.url, 
+                                                       self.max_depth)
 
 
 class SearchManager:
 
-    def __init__(self, max_workers=1, webgraph=None, callback=None):
-        self.webgraph = webgraph or WebGraph()
-        self._emails = dict()
+    def __init__(self, max_workers=1, webgraph=None, callback=None, 
+                 session=None, max_host_connections=None, 
+                 parser="html.parser", parse_workers=None, 
+                 release_content=False, checkpoint=None, sinks=None,
+                 host_rate=None, timeout=(10.0, 30.0), retries=2, 
+                 retry_backoff=0.5, max_host_failures=None, 
+                 content_types=("text",), max_size=10 * 1024 * 1024,
+                 cache=None, dedup=None, canonicalizer=None, 
+                 seen_error_rate=None, scorer=None, max_emails=None,
+                 max_pages_without_emails=None, email_per_domain=False):
+        self.webgraph = webgraph if webgraph is not None else WebGraph()
+        self.checkpoint = checkpoint
+        self.sinks = list(sinks or [])
+        self.parser = parser
+        self.parse_workers = parse_workers
+        self.release_content = release_content
         self.max_workers = max_workers
+        self.max_host_connections = max_host_connections
+        self.host_rate = host_rate
+        self.timeout = timeout # (connect, read) in seconds
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.max_host_failures = max_host_failures
+        self.content_types = content_types # bodies of other types are skipped
+        self.max_size = max_size # bigger bodies are skipped
+        self.cache = cache # HTTPCache of pages from previous searches
+        self.dedup = dedup # ContentIndex of searched contents
+        self._fingerprints = dict() # page -> fingerprint of its content
+        self._near_duplicates = set() # pages whose links are not followed
+        self.canonicalizer = canonicalizer # e.g. Canonicalizer, url -> url
+        self.seen_error_rate = seen_error_rate
+        self.scorer = scorer # e.g. KeywordScorer, Link -> score
+
+        # Targets of the search: it stops when max_emails are found or when
+        # max_pages_without_emails pages in a row yield no new emails; with
+        # email_per_domain host is not visited any more once email is found
+        # on it.
+        self.max_emails = max_emails
+        self.max_pages_without_emails = max_pages_without_emails
+        self.email_per_domain = email_per_domain
+        self.stopped = None # reason of stopping the search early
+        self.budget = Budget() # limits of cost of the current search
+        self._found = set() # emails found so far
+        self._pages_without_emails = 0
+        self.failed = dict() # page -> exception or status code
+        self._throttled = dict() # page -> number of re-queues after throttling
+        self.session = session or self._create_session()
+        self.frontier = self._create_frontier()
+        self.scheduler = self._create_scheduler()
+        self._emails = dict()
+
+        # Graphs able to store emails of visited pages (e.g. SQLiteWebGraph)
+        # are used instead of the dictionary.
+        self._store = self.webgraph if hasattr(self.webgraph, "add_emails") \
+                          else None
         self.external_filters = []
         self.callback = callback
 
     def add_filter(self, filter):
         self.external_filters.append(filter)
 
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
     def _filter_within_domain(self, root_url):
         def _filter(page):
             _, root_netloc, *_ = urlparse.urlsplit(root_url)
@@ -63,67 +318,540 @@ class SearchManager:
                 return False
         return _filter
 
+    def _create_session(self):
+        return create_session(self.max_workers, self.max_host_connections)
+
+    def _create_frontier(self):
+        '''
+        Create frontier remembering discovered pages in exact set or, when
+        seen_error_rate is set, in Bloom filter with such false positive 
+        rate (pages taken as seen are never visited). With scorer pages are
+        visited best-first instead of in BFS order.
+        '''
+        seen = None
+        if self.seen_error_rate:
+            seen = ScalableBloomFilter(error_rate=self.seen_error_rate)
+        if self.scorer is not None:
+            return PriorityFrontier(seen)
+        return Frontier(seen)
+
+    def _create_scheduler(self):
+        return HostScheduler(self.max_host_connections, self.host_rate,
+                             max_failures=self.max_host_failures)
+
+    def _search_filters(self, root_page, within_domain):
+        # Pages from other domains are rejected before external filters see
+        # (and count) them
+        filters = list()
+        if within_domain:
+            filters.append(self._filter_within_domain(root_page.url))
+        return filters + self.external_filters
+
     def _update_internals(self, page):
-        '''Search webpage and updage webgraph.'''
-        result = search_webpage(page)
-        for url in result.urls:
-            self.webgraph.add_page(url, parent=page)
-        self._emails.setdefault(page, set()).update(result.emails)
+        '''
+        Search webpage and updage webgraph. Returns tuple (pages found on the
+        page, search result).
+        '''
+        return self._merge_result(
+            search_webpage(page, self.parser, self.scorer is not None)
+        )
+
+    def _merge_result(self, result):
+        '''
+        Update webgraph & emails with search result. Returns tuple (pages 
+        found on the page, search result with normalized urls).
+        '''
+        page = result.page
+        urls = result.urls
+        anchors = result.anchors
+        if self.canonicalizer:
+            urls = set(map(self.canonicalizer, urls))
+            if anchors:
+                anchors = { self.canonicalizer(url): text
+                                for url, text in anchors.items() }
+        pages = [self.webgraph.add_page(url, parent=page) for url in urls]
+        if anchors:
+            anchors = { util.normalize_url(url): text 
+                            for url, text in anchors.items() }
+        result = SearchResult(page, [item.url for item in pages], 
+                              result.emails, anchors)
+        if self.cache is not None and page.loaded and not page.released and \
+                not page.from_cache and page.status_code == 200:
+            self.cache.store(page.url, page.headers, result.urls, 
+                             result.emails)
+        fingerprint = self._fingerprints.pop(page, None)
+        if fingerprint:
+            self.dedup.add(fingerprint, result)
+        if self._store is not None:
+            self._store.add_emails(page, result.emails)
+        else:
+            self._emails.setdefault(page, set()).update(result.emails)
+        if self.release_content:
+            page.release()
+        if self.checkpoint:
+            self.checkpoint.searched(page.url, result.urls, result.emails)
+        for sink in self.sinks:
+            sink.write(result)
+        return pages, result
+
+    def _discover(self, page, depth, parent=None, seed=None):
+        score = self._score(page, depth, parent)
+        if self.frontier.add(page, depth, score=score, seed=seed) and \
+                self.checkpoint:
+            self.checkpoint.seen(page.url, depth)
+
+    def _score(self, page, depth, parent=None):
+        '''Returns score of the page found in search result of parent.'''
+        if self.scorer is None:
+            return 0
+        if parent is None:
+            return self.scorer(Link(page, None, depth, None, 0))
+        anchor = parent.anchors.get(page.url) if parent.anchors else None
+        return self.scorer(
+            Link(page, parent.page, depth, anchor, len(parent.emails))
+        )
+
+    def _schedule(self, page, pages, result=None):
+        '''
+        Add pages discovered on the page to the frontier (within limits of 
+        the seed of the page), unless targets of the search have been 
+        reached. Returns the seed.
+        '''
+        seed = self.frontier.seed(page)
+        depth = self.frontier.depth(page) + 1
+        self.frontier.done(page)
+        if result is not None:
+            seed.add(result)
+            self._check_targets(result)
+        if page in self._near_duplicates:
+            # links of the page are (nearly) the same as of its original
+            self._near_duplicates.discard(page)
+            return seed
+        if self.stopped or depth > seed.max_depth:
+            return seed
+        for new_page in pages:
+            if new_page in self.frontier:
+                continue
+            if all(fmap(new_page, *seed.filters)):
+                self._discover(new_page, depth, result, seed)
+        return seed
+
+    def _check_targets(self, result):
+        new_emails = set(result.emails) - self._found
+        self._found.update(new_emails)
+        if new_emails:
+            self._pages_without_emails = 0
+        else:
+            self._pages_without_emails += 1
+
+        if self.email_per_domain and result.emails:
+            host = HostScheduler.host(result.page)
+            for page in self.scheduler.close(host):
+                self.frontier.done(page)
+        if self.max_emails and len(self._found) >= self.max_emails:
+            self.stop("max emails")
+        elif self.max_pages_without_emails and \
+                self._pages_without_emails >= self.max_pages_without_emails:
+            self.stop("pages without emails")
+
+    def stop(self, reason="stopped"):
+        '''
+        Stop the search: no more pages are downloaded, pages being downloaded
+        or searched are finished and their results returned.
+        '''
+        if not self.stopped:
+            self.stopped = reason
+
+    def _next_page(self):
+        '''
+        Returns next page which can be downloaded without breaking limits of 
+        its host and budget of the search or None. Pages are moved from the
+        frontier to the scheduler only when the scheduler has nothing to 
+        hand out.
+        '''
+        if not self.stopped and self.budget.exhausted():
+            self.stop(self.budget.exhausted())
+        if self.stopped:
+            return None
+        page = self.scheduler.pop()
+        while page is None and self.frontier:
+            new_page = self.frontier.pop()
+            if not self.scheduler.add(new_page, self.frontier.score(new_page)):
+                self.frontier.done(new_page) # host evicted or closed
+            page = self.scheduler.pop()
+        if page is not None and not self.budget.charge(page):
+            for item in self.scheduler.close(HostScheduler.host(page)):
+                self.frontier.done(item)
+        return page
+
+    def _downloaded(self, page, future):
+        '''
+        Let scheduler know that the request for the page has ended. Returns
+        False when the page could not be downloaded.
+        '''
+        error = future.exception()
+        status_code = getattr(page, "status_code", None) if not error \
+                          else None
+        throttled = status_code in THROTTLE_STATUS_CODES and \
+            self._throttled.get(page, 0) < self.retries
+        failed = error is not None or \
+            (status_code in RETRY_STATUS_CODES and not throttled)
+        dropped = self.scheduler.done(page, status_code, retry_after(page), 
+                                      failed)
+        for item in dropped:
+            self.frontier.done(item)
+        if throttled:
+            self._requeue(page)
+            return False
+        self._throttled.pop(page, None)
+        if failed:
+            self.failed[page] = error or status_code
+        if error is not None:
+            self.frontier.done(page)
+            return False
+        self.budget.received(len(getattr(page, "content", None) or b""))
+        return True
+
+    def _requeue(self, page):
+        '''
+        Queue the page answered with throttling response again. The scheduler
+        delays the next request to its host (honouring Retry-After).
+        '''
+        self._throttled[page] = self._throttled.get(page, 0) + 1
+        if not self.scheduler.add(page, self.frontier.score(page)):
+            self._throttled.pop(page)
+            self.frontier.done(page) # host evicted or closed
+
+    def _wait_timeout(self, running, searching=0):
+        '''
+        How long to wait for running workers and searches before checking the
+        scheduler again. None means until any of them completes (no new page
+        can be downloaded before that, e.g. after the search was stopped).
+        '''
+        if self.stopped or running >= self.max_workers or \
+                searching >= self.max_workers:
+            return None
+        return self.scheduler.delay()
 
     @property
     def visited(self):
+        if self._store is not None:
+            return self._store.visited_pages()
         return self._emails.keys()
 
     @property
     def emails(self):
+        if self._store is not None:
+            return self._store.all_emails()
         return reduce(operator.or_, self._emails.values(), set())
 
     def __getitem__(self, page):
+        if self._store is not None:
+            return self._store.emails_of(page)
         return self._emails[page]
 
+    def iter_emails(self):
+        '''Returns an iterator over tuples (url of the page, email).'''
+        if self._store is not None:
+            return self._store.iter_emails()
+        return ((page.url, email) for page, emails in self._emails.items()
+                                  for email in emails)
+
+    def _request_options(self):
+        return dict(timeout=self.timeout, content_types=self.content_types,
+                    max_size=self.max_size, cache=self.cache)
+
+    def _fingerprint(self, page):
+        '''
+        Fingerprint content of the downloaded page for dedup. Runs in the
+        worker, so the main loop does not hash contents.
+        '''
+        if self.dedup is not None and not page.from_cache and page.content:
+            self._fingerprints[page] = self.dedup.fingerprint(page.content)
+
+    def _known_result(self, page):
+        '''
+        Returns result of search of the downloaded page when it is already
+        known: page has not been modified since it was cached or has the same
+        content as the page searched before (the page becomes an alias of 
+        that page in webgraph). Returns None when page has to be searched.
+        Near-duplicates are searched for their own emails, but their links
+        are not followed. Copies under other directory are searched too, as
+        their relative links point to other urls.
+        '''
+        if page.from_cache:
+            return SearchResult(page, page.urls, page.emails)
+        fingerprint = self._fingerprints.get(page)
+        if fingerprint is None:
+            return None
+
+        original = self.dedup.find(fingerprint)
+        if original is None:
+            return None
+        del self._fingerprints[page] # only originals are indexed
+        if fingerprint not in self.dedup:
+            self._near_duplicates.add(page)
+            return None
+        if _base_url(page.url) != _base_url(original.page.url):
+            return None
+        if hasattr(self.webgraph, "add_alias"):
+            self.webgraph.add_alias(page, original.page)
+        return SearchResult(page, original.urls, original.emails, 
+                            original.anchors)
+
+    def _search_failed(self, page, error):
+        self.failed[page] = error
+        self._fingerprints.pop(page, None)
+        self._near_duplicates.discard(page)
+        self.frontier.done(page)
+
+    def _fetch(self, page):
+        '''
+        Download the page. Connection errors, timeouts and 5xx responses are
+        retried up to retries times, except throttling responses (503), which
+        are re-queued through the scheduler (see _downloaded).
+        '''
+        for attempt in itertools.count():
+            try:
+                page.reload(session=self.session, **self._request_options())
+            except RETRY_EXCEPTIONS:
+                if attempt >= self.retries:
+                    raise
+            else:
+                if attempt >= self.retries or \
+                        page.status_code not in RETRY_STATUS_CODES or \
+                        page.status_code in THROTTLE_STATUS_CODES:
+                    return page
+            time.sleep(retry_delay(attempt, self.retry_backoff))
+
+    def _download(self, page):
+        self._fetch(page)
+        self._fingerprint(page)
+        return page
+
     def _submit_worker(self, page, executor):
-        future = executor.submit(page.reload)
+        future = executor.submit(self._download, page)
         if self.callback:
             future.add_done_callback(self.callback)
         return future
 
-    def search(self, root_page, max_depth, within_domain=True):
-
-        # Set filters
-        filters = self.external_filters
-        if within_domain:
-            filters.append(self._filter_within_domain(root_page.url))
-
+    def _create_parser_pool(self):
+        '''
+        Create pool of processes searching downloaded pages. Returns None when
+        pages should be searched by the main thread.
+        '''
+        if self.parse_workers:
+            return futures.ProcessPoolExecutor(self.parse_workers)
+        return None
+
+    def _submit_search(self, page, executor):
+        if not page.loaded:
+            raise ValueError("empty WebPage object, reload required")
+        return executor.submit(
+            search_content, *_content_of(page), parser=self.parser,
+            anchors=self.scorer is not None
+        )
+
+    def search(self, root_page, max_depth, within_domain=True, budget=None):
+        '''
+        Search pages up to max_depth links from the root_page. With budget
+        (see Budget) the search stops when its limits are reached; results
+        of pages searched until then are kept (see stopped).
+        '''
+        for _ in self.iter_search(root_page, max_depth, within_domain, 
+                                  budget):
+            pass
+
+    def iter_search(self, root_page, max_depth, within_domain=True, 
+                    budget=None):
+        '''
+        Generator version of search yielding SearchResult of every page as
+        soon as the page is searched. The crawler runs only while results are
+        consumed: at most max_workers pages are downloaded ahead.
+        '''
+        self._start([Seed(root_page, max_depth, within_domain)], budget)
+        results = self._iter_run()
+        try:
+            for _, result in results:
+                yield result
+        finally:
+            results.close()
+
+    def search_many(self, seeds, max_depth=0, within_domain=True, 
+                    budget=None):
+        for _ in self.iter_search_many(seeds, max_depth, within_domain, 
+                                       budget):
+            pass
+
+    def iter_search_many(self, seeds, max_depth=0, within_domain=True,
+                         budget=None):
+        '''
+        Search from many root pages at once sharing workers, scheduler and 
+        connections. Seeds are Seed objects or urls/pages (searched with 
+        max_depth and within_domain). Yields tuples (seed, SearchResult) as 
+        soon as pages are searched; emails are also collected per seed. Page
+        reachable from many seeds is searched once, for the first of them.
+        '''
+        self._start(self._as_seeds(seeds, max_depth, within_domain), budget)
+        yield from self._iter_run()
+
+    @staticmethod
+    def _as_seeds(items, max_depth, within_domain):
+        return [item if isinstance(item, Seed) else 
+                    Seed(item, max_depth, within_domain) for item in items]
+
+    def resume(self, checkpoint=None, budget=None):
+        '''
+        Continue search saved in the checkpoint (defaults to the checkpoint 
+        of the manager). Pages which had not been searched before the search 
+        was stopped are visited again.
+        '''
+        self._restore(checkpoint, budget)
+        for _ in self._iter_run():
+            pass
+
+    def _start(self, seeds, budget=None):
+        self.frontier = self._create_frontier()
+        self.scheduler = self._create_scheduler()
+        self._reset_limits(budget)
+        if self.checkpoint:
+            if len(seeds) != 1:
+                raise ValueError("checkpoint supports search of one seed")
+            seed, = seeds
+            self.checkpoint.start(seed.url, seed.max_depth, 
+                                  seed.within_domain)
+        for seed in seeds:
+            seed.filters = self._search_filters(seed.page, seed.within_domain)
+            self._discover(seed.page, 0, seed=seed)
+
+    def _reset_limits(self, budget=None):
+        self.stopped = None
+        self.budget = budget or Budget()
+        self.budget.start()
+        self._found = set()
+        self._pages_without_emails = 0
+
+    def _restore(self, checkpoint=None, budget=None):
+        '''
+        Restore frontier, webgraph and emails from the checkpoint. Returns 
+        seed of the search.
+        '''
+        self.checkpoint = checkpoint or self.checkpoint
+        checkpoint, self.checkpoint = self.checkpoint, None # do not log twice
+        state = checkpoint.load()
+
+        replayed = list()
+        for url, urls, emails in state.results:
+            page = WebPage(url, load_page=False)
+            replayed.append(
+                self._merge_result(SearchResult(page, urls, emails))
+            )
+
+        self.frontier = self._create_frontier()
+        self.scheduler = self._create_scheduler()
+        self._reset_limits(budget)
+        self._found.update(self.emails)
+        seed = Seed(state.root_url, state.max_depth, state.within_domain)
+        seed.filters = self._search_filters(seed.page, seed.within_domain)
+        for url, depth in state.seen:
+            page = WebPage(url, load_page=False)
+            self.frontier.add(page, depth, visit=page not in self.visited, 
+                              score=self._score(page, depth), seed=seed)
+
+        # Links of pages searched just before the search was interrupted may
+        # have not been journaled yet, discover them again.
+        self.checkpoint = checkpoint
+        depths = dict(state.seen)
+        for pages, result in replayed:
+            depth = depths.get(result.page.url)
+            if depth is None or depth >= seed.max_depth:
+                continue
+            for new_page in pages:
+                if new_page not in self.frontier and \
+                        all(fmap(new_page, *seed.filters)):
+                    self._discover(new_page, depth + 1, result, seed)
+        return seed
+
+    def _iter_run(self):
+        '''Run the search. Yields tuples (seed, SearchResult).'''
         workers = dict()
+        searches = dict()
 
+        parsers = self._create_parser_pool()
         with futures.ThreadPoolExecutor(self.max_workers) as executor:
-            workers[root_page] = self._submit_worker(root_page, executor)
             try:
-                while workers:
-                    # Collect pages
-                    for page, future in list(workers.items()):
-                        if future.done():
-                            self._update_internals(page)
-                            del workers[page]
-
-                    # Check for new pages to visist
-                    pages2visit = self.webgraph.find_nearest_neighbours(
-                        root_page, max_depth, with_dist=False
+                while True:
+                    # Keep all workers busy with pages from the frontier, but
+                    # do not download faster than the pages are searched and
+                    # than the hosts allow.
+                    while len(workers) < self.max_workers \
+                            and len(searches) < self.max_workers:
+                        page = self._next_page()
+                        if page is None:
+                            break
+                        workers[self._submit_worker(page, executor)] = page
+
+                    if not workers and not searches:
+                        if not self.scheduler or self.stopped:
+                            break
+                        time.sleep(self.scheduler.delay() or 0)
+                        continue
+
+                    # Block until at least one page has been downloaded or 
+                    # searched (or a host waiting in the scheduler is ready)
+                    done, _ = futures.wait(
+                        list(workers) + list(searches), 
+                        timeout=self._wait_timeout(len(workers), len(searches)),
+                        return_when=futures.FIRST_COMPLETED
                     )
 
-                    if pages2visit:
-                        # Apply filters
-                        pages2visit = set(pages2visit) - self.visited - set(workers)
-                        pages2visit = (page for page in pages2visit 
-                                           if all(fmap(page, *filters)))
-                        for page in pages2visit:
-                            workers[page] = self._submit_worker(page, executor)
+                    for future in done:
+                        if future in workers:
+                            page = workers.pop(future)
+                            if not self._downloaded(page, future):
+                                continue
+                            known = self._known_result(page)
+                            if known:
+                                pages, result = self._merge_result(known)
+                            elif parsers:
+                                searches[self._submit_search(page, parsers)] \
+                                    = page
+                                continue
+                            else:
+                                try:
+                                    pages, result = \
+                                        self._update_internals(page)
+                                except Exception as error:
+                                    self._search_failed(page, error)
+                                    continue
+                        else:
+                            page = searches.pop(future)
+                            if future.exception():
+                                self._search_failed(page, future.exception())
+                                continue
+                            pages, result = self._merge_result(
+                                SearchResult(page, *future.result())
+                            )
+                        yield self._schedule(page, pages, result), result
 
             except KeyboardInterrupt:
                 executor.shutdown()
-                for page, future in workers.items():
-                    if future.done():
+                for future, page in workers.items():
+                    if future.done() and not future.exception():
                         self._update_internals(page)
+                for future, page in searches.items():
+                    if future.done() and not future.exception():
+                        self._merge_result(SearchResult(page, *future.result()))
+            finally:
+                if parsers:
+                    parsers.shutdown()
+                self._flush()
+
+    def _flush(self):
+        if self.checkpoint:
+            self.checkpoint.flush()
+        for sink in self.sinks:
+            sink.flush()
 
 
 def avoid_extensions(exts=["bmp", "jpeg", "jpg", "pdf", "php", "css", "js", 
@@ -148,6 +876,4 @@ def save_to_csv(path, manager):
         writer = csv.writer(csvfile, delimiter=";", quotechar="|", 
                             quoting=csv.QUOTE_MINIMAL)
         writer.writerow(("page", "email"))
-        for page in manager.visited:
-            for email in manager[page]:
-                writer.writerow((page.url, email))
\ No newline at end of file
+        writer.writerows(manager.iter_emails())
\ No newline at end of file
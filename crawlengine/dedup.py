@@ -0,0 +1,129 @@
+import hashlib
+import re
+from collections import namedtuple
+
+
+Fingerprint = namedtuple("Fingerprint", "digest simhash")
+
+RE_TAG = re.compile(rb"<[^>]*>")
+RE_WORD = re.compile(rb"\w+")
+
+# Tables mapping byte to value of its n-th bit (for bytes.translate)
+BIT_TABLES = [bytes(value >> bit & 1 for value in range(256)) 
+                  for bit in range(8)]
+
+
+def digest(content):
+    '''Returns exact fingerprint (hash) of the content.'''
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+def simhash(content, bits=64, shingle=3):
+    '''
+    Returns SimHash of the content: similar contents get hashes differing
+    in a few bits only. Text is split into words (html tags are skipped) and
+    every shingle of consecutive words votes for bits of its hash. Votes are
+    counted per bit over concatenated hashes, so the work done in Python
+    does not grow with the number of shingles.
+    '''
+    words = RE_WORD.findall(RE_TAG.sub(b" ", content).lower())
+    shingles = set(
+        b" ".join(words[i:i+shingle])
+            for i in range(max(1, len(words) - shingle + 1))
+    )
+    size = bits // 8
+    hashes = b"".join(hashlib.blake2b(item, digest_size=size).digest()
+                          for item in shingles)
+    value = 0
+    for bit in range(bits):
+        # bytes of hashes holding the bit (hashes are big endian numbers)
+        column = hashes[size - 1 - bit // 8::size]
+        if 2 * column.translate(BIT_TABLES[bit % 8]).count(1) > len(shingles):
+            value |= 1 << bit
+    return value
+
+
+def hamming(a, b):
+    '''Number of bits different in two hashes.'''
+    return bin(a ^ b).count("1")
+
+
+class ContentIndex:
+    '''
+    Index of contents of searched pages, so the page with the same content
+    (e.g. served under other url) does not have to be searched again. Every
+    content is identified with exact hash. With near_duplicates contents
+    with SimHash different in at most max_distance bits are also treated
+    as duplicates (SimHash is split into max_distance + 1 blocks, similar
+    hashes have at least one block in common).
+    '''
+
+    BITS = 64
+
+    def __init__(self, near_duplicates=False, max_distance=3):
+        self.near_duplicates = near_duplicates
+        self.max_distance = max_distance
+        self.checked = 0
+        self.duplicates = 0
+        self._results = dict() # digest -> result of search
+        self._blocks = dict()  # (block no., block of simhash) -> digests
+        self._simhashes = dict() # digest -> simhash
+
+        nblocks = max_distance + 1
+        size = self.BITS // nblocks
+        self._ranges = [
+            (i * size, self.BITS if i == nblocks - 1 else (i + 1) * size)
+                for i in range(nblocks)
+        ]
+
+    def fingerprint(self, content):
+        return Fingerprint(
+            digest(content),
+            simhash(content, self.BITS) if self.near_duplicates else None
+        )
+
+    def _keys(self, value):
+        for no, (start, end) in enumerate(self._ranges):
+            yield no, value >> start & ((1 << (end - start)) - 1)
+
+    def find(self, fingerprint):
+        '''
+        Returns result of search of the content with the fingerprint (or
+        similar one) or None when the content is new.
+        '''
+        self.checked += 1
+        result = self._results.get(fingerprint.digest)
+        if result is None and self.near_duplicates:
+            result = self._find_similar(fingerprint.simhash)
+        if result is not None:
+            self.duplicates += 1
+        return result
+
+    def _find_similar(self, value):
+        for key in self._keys(value):
+            for item in self._blocks.get(key, ()):
+                if hamming(self._simhashes[item], value) <= self.max_distance:
+                    return self._results[item]
+        return None
+
+    def add(self, fingerprint, result):
+        '''Save result of search of the content with the fingerprint.'''
+        if fingerprint.digest in self._results:
+            return
+        self._results[fingerprint.digest] = result
+        if self.near_duplicates:
+            self._simhashes[fingerprint.digest] = fingerprint.simhash
+            for key in self._keys(fingerprint.simhash):
+                self._blocks.setdefault(key, list()).append(fingerprint.digest)
+
+    def __contains__(self, fingerprint):
+        '''Content with exactly the same fingerprint has been searched.'''
+        return fingerprint.digest in self._results
+
+    @property
+    def ratio(self):
+        '''Fraction of checked contents which turned out to be duplicates.'''
+        return self.duplicates / self.checked if self.checked else 0.0
+
+    def __len__(self):
+        return len(self._results)
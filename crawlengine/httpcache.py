@@ -0,0 +1,140 @@
+import json
+import sqlite3
+import threading
+from collections import namedtuple
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    urls TEXT NOT NULL,
+    emails TEXT NOT NULL,
+    used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_used ON cache (used);
+'''
+
+
+class CacheEntry(namedtuple("CacheEntry", "etag last_modified urls emails")):
+    '''Validators of the cached response and results of its search.'''
+
+    __slots__ = ()
+
+    def validators(self):
+        '''Returns headers of conditional request for the page.'''
+        headers = dict()
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    '''
+    On-disk cache of searched pages kept in SQLite database. For every page
+    (by normalized url) with ETag or Last-Modified header it keeps the
+    validators and urls & emails found on the page, so the page can be
+    requested conditionally next time and, when the server responds with
+    304 Not Modified, is not downloaded nor searched again. The cache keeps
+    at most max_entries pages, least recently used pages are evicted.
+    Lookups only read the database: times of use are buffered and written
+    in batches of batch_size (and with every stored page), so lookups do not
+    commit. Can be shared by worker threads.
+    '''
+
+    def __init__(self, path, max_entries=100000, batch_size=1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self._used = dict() # url -> time of use not written yet
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._size, self._clock = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(used), 0) FROM cache"
+        ).fetchone()
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def lookup(self, url):
+        '''Returns CacheEntry of the page with given url or None.'''
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, urls, emails FROM cache "
+                "WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._used[url] = self._tick()
+            if len(self._used) >= self.batch_size:
+                with self._conn:
+                    self._write_used()
+        etag, last_modified, urls, emails = row
+        return CacheEntry(etag, last_modified, json.loads(urls),
+                          json.loads(emails))
+
+    def store(self, url, headers, urls, emails):
+        '''
+        Save results of searching the page. Pages without validators (ETag
+        or Last-Modified header) cannot be requested conditionally and are
+        not cached. Returns True when the page has been cached.
+        '''
+        etag = headers.get("ETag", None)
+        last_modified = headers.get("Last-Modified", None)
+        if not etag and not last_modified:
+            return False
+
+        with self._lock, self._conn:
+            self._write_used()
+            exists = self._conn.execute(
+                "SELECT 1 FROM cache WHERE url = ?", (url,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache "
+                "(url, etag, last_modified, urls, emails, used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(list(urls)),
+                 json.dumps(list(emails)), self._tick())
+            )
+            if not exists:
+                self._size += 1
+            if self._size > self.max_entries:
+                self._evict(self._size - self.max_entries)
+        return True
+
+    def _write_used(self):
+        self._conn.executemany(
+            "UPDATE cache SET used = ? WHERE url = ?",
+            ((used, url) for url, used in self._used.items())
+        )
+        self._used = dict()
+
+    def _evict(self, count):
+        '''Remove count least recently used pages.'''
+        self._conn.execute(
+            "DELETE FROM cache WHERE url IN "
+            "(SELECT url FROM cache ORDER BY used LIMIT ?)", (count,)
+        )
+        self._size -= count
+
+    def close(self):
+        with self._lock:
+            with self._conn:
+                self._write_used()
+            self._conn.close()
+
+    def __contains__(self, url):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM cache WHERE url = ?", (url,)
+            ).fetchone() is not None
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,53 @@
+import re
+import urllib.parse as urlparse
+from collections import namedtuple
+
+
+# Link to the page discovered during the search: page, page it was found on
+# (None for the root page), depth of the page, text of anchors linking to
+# the page (None when unknown) and number of emails found on the parent.
+Link = namedtuple("Link", "page parent depth anchor parent_emails")
+
+# Words in url or anchor text of pages which usually list email addresses
+# and their weights.
+KEYWORDS = {
+    "contact": 10, "kontakt": 10, "contacto": 10, "contatti": 10,
+    "imprint": 8, "impressum": 8, "mentions-legales": 8,
+    "about": 6, "team": 6, "staff": 6, "people": 6, "management": 5,
+    "office": 4, "support": 4, "press": 4, "legal": 3, "company": 3,
+    "career": 2, "jobs": 2
+}
+
+RE_WORD_SEPARATOR = re.compile(r"[\s_]+")
+
+
+class KeywordScorer:
+    '''
+    Scoring of links for best-first search (see SearchManager scorer).
+    Links get weight of every keyword found in path of the url and
+    anchor_weight times weight of every keyword found in anchor text;
+    email_bonus is added when the parent page yielded emails (pages near
+    them are likely to list more) and depth_penalty is subtracted for every
+    level of depth. Pages with higher score are visited first.
+    '''
+
+    def __init__(self, keywords=None, anchor_weight=1.0, email_bonus=2.0,
+                 depth_penalty=1.0):
+        self.keywords = KEYWORDS if keywords is None else keywords
+        self.anchor_weight = anchor_weight
+        self.email_bonus = email_bonus
+        self.depth_penalty = depth_penalty
+
+    def _matches(self, text):
+        text = RE_WORD_SEPARATOR.sub("-", text.lower())
+        return sum(weight for keyword, weight in self.keywords.items()
+                       if keyword in text)
+
+    def __call__(self, link):
+        _, _, path, qs, _ = urlparse.urlsplit(link.page.url)
+        score = self._matches(urlparse.unquote(path + "?" + qs))
+        if link.anchor:
+            score += self.anchor_weight * self._matches(link.anchor)
+        if link.parent_emails:
+            score += self.email_bonus
+        return score - self.depth_penalty * link.depth
@@ -0,0 +1,220 @@
+import heapq
+import itertools
+import time
+import urllib.parse as urlparse
+from collections import deque
+
+
+# Responses telling the crawler to slow down
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class HostQueue:
+    '''Pages of one host waiting for download and politeness state of host.'''
+
+    __slots__ = ("pages", "active", "ready_at", "penalty", "failures", 
+                 "scheduled")
+
+    def __init__(self):
+        self.pages = list()   # heap of (-priority, order of adding, page)
+        self.active = 0       # number of pages being downloaded
+        self.ready_at = 0.0   # earliest time of the next request
+        self.penalty = 0.0    # extra delay added after throttling responses
+        self.failures = 0     # number of consecutive failed requests
+        self.scheduled = False # host is in ready or waiting hosts
+
+
+class HostScheduler:
+    '''
+    Politeness layer between the frontier and workers. Pages are queued per
+    host and handed out round robin, so pages of different hosts are
+    interleaved; pages of one host are handed out in order of priority
+    (and of adding when equal). Hosts which have to wait are kept in a heap
+    by the time they become ready, so handing out a page does not scan all
+    the hosts. Host gets at most max_connections simultaneous requests and
+    at most rate requests per second (both unlimited when None). Responses
+    429 and 503 double the delay between requests to the host (up to
+    max_delay seconds, or as long as Retry-After says), successful responses
+    halve it back. Host failing max_failures times in a row (circuit 
+    breaker) is evicted: its waiting pages are dropped and new ones are not
+    accepted. Host can also be closed the same way, e.g. when the search
+    does not need more of its pages.
+    '''
+
+    def __init__(self, max_connections=None, rate=None, backoff=1.0,
+                 max_delay=60.0, max_failures=None, clock=time.monotonic):
+        self.max_connections = max_connections
+        self.max_failures = max_failures
+        self.evicted = set()
+        self.closed = set()
+        self.interval = 1.0 / rate if rate else 0.0
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.clock = clock
+        self._hosts = dict()  # host -> HostQueue
+        # Hosts with pages waiting: hosts which can be downloaded from now in
+        # round robin order and heap of (ready_at, order of adding, host) of
+        # hosts which have to wait. Hosts with all connections busy are in
+        # neither of them until a request to the host is done.
+        self._ready = deque()
+        self._waiting = list()
+        self._size = 0
+        self._counter = itertools.count()
+
+    @staticmethod
+    def host(page):
+        return urlparse.urlsplit(page.url).netloc
+
+    def _queue(self, host):
+        queue = self._hosts.get(host)
+        if queue is None:
+            queue = self._hosts[host] = HostQueue()
+        return queue
+
+    def add(self, page, priority=0):
+        '''
+        Queue page for download. Returns False when the host of the page has
+        been evicted or closed.
+        '''
+        host = self.host(page)
+        if host in self.evicted or host in self.closed:
+            return False
+        queue = self._queue(host)
+        heapq.heappush(queue.pages, (-priority, next(self._counter), page))
+        self._size += 1
+        if not queue.scheduled:
+            self._schedule(host, queue, self.clock())
+        return True
+
+    def _schedule(self, host, queue, now):
+        if self.max_connections and queue.active >= self.max_connections:
+            return # scheduled again when a request to the host is done
+        queue.scheduled = True
+        if queue.ready_at <= now:
+            self._ready.append(host)
+        else:
+            heapq.heappush(self._waiting, 
+                           (queue.ready_at, next(self._counter), host))
+
+    def _reschedule(self, host, queue, now):
+        queue.scheduled = False
+        if queue.pages:
+            self._schedule(host, queue, now)
+
+    def _first_ready(self, now):
+        '''Returns the first host which pages can be downloaded now or None.'''
+        while self._waiting and self._waiting[0][0] <= now:
+            *_, host = heapq.heappop(self._waiting)
+            self._reschedule(host, self._hosts[host], now)
+        while self._ready:
+            host = self._ready[0]
+            queue = self._hosts[host]
+            if queue.pages and queue.ready_at <= now:
+                return host
+            # dropped or throttled since it became ready
+            self._ready.popleft()
+            self._reschedule(host, queue, now)
+        return None
+
+    def pop(self):
+        '''
+        Remove and return the next page which can be downloaded now. Returns
+        None when all the hosts with waiting pages are busy or have to wait.
+        '''
+        now = self.clock()
+        host = self._first_ready(now)
+        if host is None:
+            return None
+        self._ready.popleft()
+        queue = self._hosts[host]
+        *_, page = heapq.heappop(queue.pages)
+        queue.active += 1
+        queue.ready_at = now + self.interval + queue.penalty
+        self._reschedule(host, queue, now)
+        self._size -= 1
+        return page
+
+    def done(self, page, status_code=None, retry_after=None, failed=False):
+        '''
+        Record the end of the request for the page and adapt delay of the
+        host to the status code of the response. Failed requests count 
+        towards eviction of the host. Returns pages dropped because of 
+        eviction of the host.
+        '''
+        host = self.host(page)
+        queue = self._queue(host)
+        queue.active = max(0, queue.active - 1)
+        dropped = list()
+        if failed:
+            queue.failures += 1
+            if self.max_failures and queue.failures >= self.max_failures:
+                dropped = self._evict(host)
+        else:
+            queue.failures = 0
+        if status_code in THROTTLE_STATUS_CODES:
+            penalty = max(queue.penalty * 2, self.backoff, retry_after or 0)
+            queue.penalty = min(penalty, max(self.max_delay, retry_after or 0))
+            queue.ready_at = max(queue.ready_at, self.clock() + queue.penalty)
+        elif queue.penalty:
+            queue.penalty /= 2
+            if queue.penalty < self.backoff:
+                queue.penalty = 0.0
+        if not queue.scheduled: # connection of busy host is free again
+            self._reschedule(host, queue, self.clock())
+        return dropped
+
+    def _evict(self, host):
+        self.evicted.add(host)
+        return self._drop(host)
+
+    def close(self, host):
+        '''
+        Stop downloading pages of the host: waiting pages are dropped and new
+        ones are not accepted. Returns dropped pages.
+        '''
+        self.closed.add(host)
+        return self._drop(host)
+
+    def _drop(self, host):
+        queue = self._hosts.get(host)
+        if queue is None or not queue.pages:
+            return list()
+        # host is removed from ready or waiting hosts once it comes first
+        self._size -= len(queue.pages)
+        dropped = [page for *_, page in queue.pages]
+        queue.pages.clear()
+        return dropped
+
+    def delay(self):
+        '''
+        Returns number of seconds until a waiting page may become available
+        (0 when a page is available now, None when there are no pages or
+        only hosts with all connections busy have pages).
+        '''
+        now = self.clock()
+        if self._first_ready(now) is not None:
+            return 0.0
+        while self._waiting:
+            ready_at, _, host = self._waiting[0]
+            queue = self._hosts[host]
+            if queue.pages and queue.ready_at == ready_at:
+                return ready_at - now
+            # dropped or throttled since it started waiting
+            heapq.heappop(self._waiting)
+            self._reschedule(host, queue, now)
+        return None
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+
+def retry_after(response):
+    '''Returns value of Retry-After header in seconds (or None).'''
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
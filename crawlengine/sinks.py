@@ -0,0 +1,112 @@
+import csv
+import json
+import time
+
+
+class Sink:
+    '''
+    Streaming output of the search. SearchManager writes result of every
+    searched page to its sinks as soon as the page is searched. Results are
+    buffered and written in batches of buffer_size, but not less often than
+    every flush_interval seconds.
+    '''
+
+    def __init__(self, buffer_size=100, flush_interval=5.0):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._buffer = list()
+        self._last_flush = time.monotonic()
+
+    def write(self, result):
+        self._buffer.append(result)
+        if len(self._buffer) >= self.buffer_size or \
+                time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._write(self._buffer)
+        self._buffer = list()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+    def _write(self, results):
+        '''Write batch of results (subclasses define where).'''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FileSink(Sink):
+
+    def __init__(self, path, buffer_size=100, flush_interval=5.0):
+        super().__init__(buffer_size, flush_interval)
+        self.path = path
+        self._file = open(path, "w", newline="")
+
+    def flush(self):
+        super().flush()
+        self._file.flush()
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class CSVSink(FileSink):
+    '''Writes rows (page, email) in the format of crawler.save_to_csv.'''
+
+    HEADER = ("page", "email")
+
+    def __init__(self, path, buffer_size=100, flush_interval=5.0):
+        super().__init__(path, buffer_size, flush_interval)
+        self._writer = csv.writer(self._file, delimiter=";", quotechar="|",
+                                  quoting=csv.QUOTE_MINIMAL)
+        self._writer.writerow(self.HEADER)
+
+    def _rows(self, result):
+        return ((result.page.url, email) for email in result.emails)
+
+    def _write(self, results):
+        for result in results:
+            self._writer.writerows(self._rows(result))
+
+
+class WebGraphCSVSink(CSVSink):
+    '''Writes relations (from, to) in the format of WebGraph.save_to_csv.'''
+
+    HEADER = ("from", "to")
+
+    def _rows(self, result):
+        return ((result.page.url, url) for url in result.urls)
+
+
+class JSONLinesSink(FileSink):
+    '''
+    Writes one JSON object {"page": ..., "urls": ..., "emails": ...} per
+    searched page.
+    '''
+
+    def _write(self, results):
+        self._file.writelines(
+            json.dumps(dict(page=result.page.url, urls=list(result.urls),
+                            emails=list(result.emails))) + "\n"
+            for result in results
+        )
+
+
+class CallableSink(Sink):
+    '''Calls func with every SearchResult.'''
+
+    def __init__(self, func):
+        super().__init__(buffer_size=1)
+        self.func = func
+
+    def _write(self, results):
+        for result in results:
+            self.func(result)
@@ -0,0 +1,327 @@
+import csv
+import sqlite3
+from collections import deque
+
+from crawlengine.webpage import WebPage
+import crawlengine.util as util
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    visited INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS pages_visited ON pages (visited) WHERE visited;
+CREATE TABLE IF NOT EXISTS relations (
+    src INTEGER NOT NULL,
+    dst INTEGER NOT NULL,
+    PRIMARY KEY (src, dst)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS relations_dst ON relations (dst);
+CREATE TABLE IF NOT EXISTS emails (
+    page INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    PRIMARY KEY (page, email)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS emails_email ON emails (email);
+CREATE TABLE IF NOT EXISTS aliases (
+    url TEXT PRIMARY KEY,
+    page INTEGER NOT NULL
+) WITHOUT ROWID;
+'''
+
+
+class SQLiteWebGraph:
+    '''
+    WebGraph keeping pages, relations between them and emails found on them
+    in SQLite database (WAL mode), so the size of the search is not limited
+    by memory. Changes are buffered and inserted in batches of batch_size
+    rows; the buffer is flushed before every query. Passed to SearchManager
+    as webgraph it also stores emails of visited pages.
+    '''
+
+    def __init__(self, path, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._pages = list()
+        self._aliases = list()
+        self._relations = list()
+        self._emails = list()
+        self._visited = list()
+
+    def _pending(self):
+        return len(self._pages) + len(self._aliases) + len(self._relations) \
+            + len(self._emails) + len(self._visited)
+
+    def _buffered(self):
+        if self._pending() >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        '''Insert buffered changes into the database.'''
+        if not self._pending():
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO pages (url) VALUES (?)",
+                ((url,) for url in self._pages)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO aliases (url, page) "
+                "SELECT ?, id FROM pages WHERE url = ?", self._aliases
+            )
+            # Relations of aliases belong to the pages they refer to
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO relations (src, dst) SELECT "
+                "COALESCE((SELECT page FROM aliases WHERE url = ?1), "
+                "         (SELECT id FROM pages WHERE url = ?1)), "
+                "COALESCE((SELECT page FROM aliases WHERE url = ?2), "
+                "         (SELECT id FROM pages WHERE url = ?2))", 
+                self._relations
+            )
+            self._conn.executemany(
+                "UPDATE pages SET visited = 1 WHERE url = ?",
+                ((url,) for url in self._visited)
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO emails (page, email) "
+                "SELECT id, ? FROM pages WHERE url = ?", self._emails
+            )
+        self._pages, self._aliases = list(), list()
+        self._relations = list()
+        self._emails, self._visited = list(), list()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def _query(self, sql, *params):
+        self.flush()
+        return self._conn.execute(sql, params)
+
+    def _url(self, obj):
+        return obj.url if isinstance(obj, WebPage) else util.normalize_url(obj)
+
+    def _successors(self, url):
+        return [row[0] for row in self._query(
+            "SELECT p2.url FROM pages p1 "
+            "JOIN relations r ON r.src = p1.id JOIN pages p2 ON p2.id = r.dst "
+            "WHERE p1.url = ?", url
+        )]
+
+    def _predecessors(self, url):
+        return [row[0] for row in self._query(
+            "SELECT p1.url FROM pages p2 "
+            "JOIN relations r ON r.dst = p2.id JOIN pages p1 ON p1.id = r.src "
+            "WHERE p2.url = ?", url
+        )]
+
+    # WebGraph interface
+
+    def add_relation(self, p1, p2, directed=True):
+        '''Add relation between pages to graph.'''
+        url1, url2 = self._url(p1), self._url(p2)
+        self._pages.extend((url1, url2))
+        self._relations.append((url1, url2))
+        if not directed:
+            self._relations.append((url2, url1))
+        self._buffered()
+
+    def add_alias(self, alias, page):
+        '''
+        Record that alias (page or url) refers to the page, e.g. because it 
+        has the same content. From now on relations of the alias are
+        relations of the page.
+        '''
+        url, page_url = self._url(alias), self._url(page)
+        if url != page_url:
+            self._pages.append(page_url)
+            self._aliases.append((url, page_url))
+            self._buffered()
+
+    @property
+    def aliases(self):
+        '''Dict url -> page with the same content.'''
+        return { url: WebPage(page_url, load_page=False) 
+                     for url, page_url in self._query(
+                         "SELECT aliases.url, pages.url FROM aliases "
+                         "JOIN pages ON pages.id = aliases.page"
+                     ) }
+
+    def add_page(self, obj, parent=None):
+        '''
+        Adds page to graph. Accepts WebPage or url(string).
+        '''
+        if not isinstance(obj, WebPage):
+            obj = WebPage(url=util.normalize_url(obj), load_page=False)
+        if parent:
+            self.add_relation(parent, obj)
+        else:
+            self._pages.append(obj.url)
+            self._buffered()
+        return obj
+
+    def get_page(self, url, create_new=True):
+        '''
+        Returns page with given url or creates new one if there is no page
+        with the url.
+        '''
+        if url in self or create_new:
+            return WebPage(url=self._url(url), load_page=False)
+
+    def find_nearest_neighbours(self, page, max_dist, with_dist=True):
+        '''
+        Searches for the neighbours of the page within defined distance. Returns
+        list of tuples (page, distance).
+        '''
+        if page not in self:
+            return None
+
+        start = self._url(page)
+        dists = { start: 0 }
+        queue = deque((start,))
+        while queue:
+            current = queue.popleft()
+            dist = dists[current] + 1
+            if dist > max_dist:
+                continue
+            for url in self._successors(current):
+                if url not in dists:
+                    dists[url] = dist
+                    queue.append(url)
+        del dists[start]
+
+        pages = ((WebPage(url, load_page=False), dist)
+                     for url, dist in dists.items())
+        if with_dist:
+            return list(pages)
+        else:
+            return [page for page, _ in pages]
+
+    def find_path(self, pstart, pend):
+        '''
+        Searches for the shorthest path between two pages. Returns tuple containing
+        consequtive pages in the path or None if there is not path.
+        '''
+        if pstart not in self or pend not in self:
+            return None
+        start, end = self._url(pstart), self._url(pend)
+
+        # Test whether the pages are directly connected
+        if end in self._successors(start):
+            return (WebPage(start, load_page=False),
+                    WebPage(end, load_page=False))
+
+        path = util.shortest_path(start, end, self._successors,
+                                  self._predecessors)
+        if not path or len(path) < 2:
+            return None
+        return tuple(WebPage(url, load_page=False) for url in path)
+
+    def find_paths(self, pstart, targets):
+        '''
+        Searches for the shortest paths from one page to many target pages in
+        a single sweep through the graph. Returns dict target -> tuple of
+        consequtive pages in the path (or None if there is no path).
+        '''
+        targets = { self._url(target): target if isinstance(target, WebPage)
+                        else WebPage(target, load_page=False)
+                        for target in targets }
+        if pstart not in self:
+            return { target: None for target in targets.values() }
+
+        paths = util.shortest_paths(self._url(pstart), list(targets),
+                                    self._successors)
+        return {
+            targets[url]: path and
+                tuple(WebPage(item, load_page=False) for item in path)
+            for url, path in paths.items()
+        }
+
+    def __contains__(self, page):
+        return self._query("SELECT 1 FROM pages WHERE url = ?",
+                           self._url(page)).fetchone() is not None
+
+    def __iter__(self):
+        return (WebPage(row[0], load_page=False)
+                    for row in self._query("SELECT url FROM pages"))
+
+    def __getitem__(self, page):
+        if page not in self:
+            raise KeyError(page)
+        return set(WebPage(url, load_page=False)
+                       for url in self._successors(self._url(page)))
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def save_to_csv(self, path):
+        '''Save graph to csv file.'''
+        with open(path, "w", newline="") as csvfile:
+            writer = csv.writer(csvfile, delimiter=";", quotechar="|",
+                                quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(("from", "to"))
+            writer.writerows(self._query(
+                "SELECT p1.url, p2.url FROM relations r "
+                "JOIN pages p1 ON p1.id = r.src JOIN pages p2 ON p2.id = r.dst"
+            ))
+
+    # Emails of visited pages (used by SearchManager)
+
+    def add_emails(self, page, emails):
+        '''Mark page as visited and add emails found on the page.'''
+        self._pages.append(page.url)
+        self._visited.append(page.url)
+        self._emails.extend((email, page.url) for email in emails)
+        self._buffered()
+
+    def visited_pages(self):
+        return VisitedPages(self)
+
+    def is_visited(self, page):
+        return self._query(
+            "SELECT 1 FROM pages WHERE url = ? AND visited", self._url(page)
+        ).fetchone() is not None
+
+    def emails_of(self, page):
+        if not self.is_visited(page):
+            raise KeyError(page)
+        return set(row[0] for row in self._query(
+            "SELECT email FROM emails JOIN pages ON pages.id = emails.page "
+            "WHERE pages.url = ?", self._url(page)
+        ))
+
+    def all_emails(self):
+        return set(row[0] for row in
+                       self._query("SELECT DISTINCT email FROM emails"))
+
+    def iter_emails(self):
+        '''Returns an iterator over tuples (url, email).'''
+        return self._query(
+            "SELECT pages.url, email FROM emails "
+            "JOIN pages ON pages.id = emails.page"
+        )
+
+
+class VisitedPages:
+    '''View of pages visited by the crawler stored in SQLiteWebGraph.'''
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __contains__(self, page):
+        return self._graph.is_visited(page)
+
+    def __iter__(self):
+        return (WebPage(row[0], load_page=False) for row in
+                    self._graph._query("SELECT url FROM pages WHERE visited"))
+
+    def __len__(self):
+        return self._graph._query(
+            "SELECT COUNT(*) FROM pages WHERE visited"
+        ).fetchone()[0]
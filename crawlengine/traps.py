@@ -0,0 +1,77 @@
+import re
+import urllib.parse as urlparse
+from collections import Counter
+
+
+RE_NUMBER = re.compile(r"\d+")
+
+
+class TrapFilter:
+    '''
+    Filter of pages (see SearchManager.add_filter) rejecting urls typical
+    for crawler traps, i.e. infinite url spaces generated by a site:
+      - path with a segment repeated more than max_path_repeats times
+        (e.g. /a/b/a/b/a/b from relative links),
+      - more than pattern_budget urls of the same pattern: host, path with
+        numbers replaced and names of query parameters (e.g. calendar
+        /events/2024/05?view=month),
+      - more than max_param_values distinct values of a query parameter of
+        the same path (e.g. ?date=, ?offset=).
+    None turns the heuristic off. Numbers of rejected urls by the heuristic
+    are counted in rejected.
+    '''
+
+    def __init__(self, max_path_repeats=3, pattern_budget=1000,
+                 max_param_values=100):
+        self.max_path_repeats = max_path_repeats
+        self.pattern_budget = pattern_budget
+        self.max_param_values = max_param_values
+        self.rejected = Counter()
+        self._patterns = Counter()
+        self._values = dict() # (host, path, parameter) -> values
+
+    @staticmethod
+    def pattern(url):
+        '''Returns pattern of the url used for the budgets.'''
+        _, netloc, path, qs, _ = urlparse.urlsplit(url)
+        names = sorted(set(param.partition("=")[0]
+                               for param in qs.split("&") if param))
+        return "%s%s?%s" % (netloc, RE_NUMBER.sub("#", path), "&".join(names))
+
+    def _repeated(self, path):
+        segments = Counter(segment for segment in path.split("/") if segment)
+        return bool(segments) and \
+            max(segments.values()) > self.max_path_repeats
+
+    def _reject(self, reason):
+        self.rejected[reason] += 1
+        return False
+
+    def __call__(self, page):
+        _, netloc, path, qs, _ = urlparse.urlsplit(page.url)
+
+        if self.max_path_repeats is not None and self._repeated(path):
+            return self._reject("path repetition")
+
+        pattern = self.pattern(page.url)
+        if self.pattern_budget is not None and \
+                self._patterns[pattern] >= self.pattern_budget:
+            return self._reject("pattern budget")
+
+        new_values = list()
+        if self.max_param_values is not None:
+            for param in qs.split("&"):
+                if not param:
+                    continue
+                name, _, value = param.partition("=")
+                values = self._values.setdefault((netloc, path, name), set())
+                if value in values:
+                    continue
+                if len(values) >= self.max_param_values:
+                    return self._reject("parameter values")
+                new_values.append((values, value))
+
+        for values, value in new_values:
+            values.add(value)
+        self._patterns[pattern] += 1
+        return True
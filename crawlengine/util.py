@@ -1,4 +1,5 @@
 import re
+import html
 import urllib.parse as urlparse
 import imp
 import importlib
@@ -12,6 +13,21 @@ from bs4 import BeautifulSoup
 
 RE_EMAIL = r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)"
 RE_URL = r"(http|ftp|https)://([\w_-]+(?:(?:\.[\w_-]+)+))([\w.,@?^=%&:/~+#-]*[\w@?^=%&/~+#-])?"
+RE_HREF = re.compile(
+    r"""<a\s[^>]*?\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", 
+    re.IGNORECASE
+)
+RE_ANCHOR = re.compile(
+    RE_HREF.pattern + r"[^>]*>(.*?)</a\s*>", re.IGNORECASE | re.DOTALL
+)
+RE_TAG = re.compile(r"<[^>]*>")
+RE_SPACE = re.compile(r"\s+")
+RE_URL_OR_EMAIL = re.compile(
+    r"(?P<url>{})|(?P<email>{})".format(RE_URL, RE_EMAIL)
+)
+RE_HOST_PORT = re.compile(r"^(\[[^\]]*\]|[^:]*)(?::(\d*))?$")
+
+DEFAULT_PORTS = { "http": 80, "https": 443, "ftp": 21 }
 
 
 def find_with_re(text, pattern):
@@ -29,6 +45,34 @@ def find_with_bs(soup, tag, attr=None):
     return ((not attr and tag) or tag.get(attr, None) for tag in tags)
 
 
+def find_hrefs_with_re(text):
+    '''
+    Return an iterator over href attributes of anchor tags without parsing
+    the page. Also finds anchors in comments and scripts.
+    '''
+    return (html.unescape(next(filter(None, match.groups()), "")) 
+                for match in RE_HREF.finditer(text))
+
+
+def find_anchors_with_bs(soup):
+    '''
+    Return an iterator over tuples (href, text) of anchor tags in the page.
+    '''
+    return ((tag.get("href", None), tag.get_text(" ", strip=True)) 
+                for tag in soup.find_all("a"))
+
+
+def find_anchors_with_re(text):
+    '''
+    Return an iterator over tuples (href, text) of anchor tags without 
+    parsing the page. Anchors without closing tag are skipped.
+    '''
+    for match in RE_ANCHOR.finditer(text):
+        href = next(filter(None, match.groups()[:3]), "")
+        content = html.unescape(RE_TAG.sub(" ", match.group(4)))
+        yield html.unescape(href), RE_SPACE.sub(" ", content).strip()
+
+
 def filter_with_re(iterable, pattern=None):
     if not pattern:
         return iterable
@@ -47,15 +91,33 @@ def url_fix(s, charset='utf-8'):
 
 
 def normalize_url(url, charset="utf-8"):
-    '''Normalize url. Get rid of query and anchor.'''
+    '''
+    Normalize url. Get rid of anchor, lowercase scheme & host and drop 
+    default port.
+    '''
     if isinstance(url, bytes):
         url = url.decode(charset, errors="ignore")
     scheme, netloc, path, qs, anchor = urlparse.urlsplit(url)
     path = urlparse.quote(path, "/%")
     if path == "": path = "/"
+    if netloc:
+        netloc = normalize_netloc(scheme, netloc)
     return urlparse.urlunsplit((scheme, netloc, path, qs, None))
 
 
+def normalize_netloc(scheme, netloc):
+    '''Lowercase host and drop port which is default for the scheme.'''
+    userinfo, at, hostport = netloc.rpartition("@")
+    match = RE_HOST_PORT.match(hostport)
+    if not match:
+        return netloc
+    host, port = match.groups()
+    netloc = userinfo + at + host.lower()
+    if port and int(port) != DEFAULT_PORTS.get(scheme):
+        netloc += ":" + port
+    return netloc
+
+
 def load_module(name, attach = False, force_reload = True):
     '''Load dynamically module.'''
     if name in sys.modules and force_reload:
@@ -75,4 +137,81 @@ def load_module(name, attach = False, force_reload = True):
 
 def fmap(item, *args):
     '''Applies each func in args to item, yielding the result.'''
-    return (f(item) for f in args)
\ No newline at end of file
+    return (f(item) for f in args)
+
+
+def shortest_path(start, end, successors, predecessors):
+    '''
+    Bidirectional breadth-first search for the shortest path between nodes of
+    unweighted directed graph. Successors and predecessors are functions
+    returning iterables of neighbouring nodes. Returns list of consecutive 
+    nodes or None when there is no path.
+    '''
+    if start == end:
+        return [start]
+
+    prevs, nexts = { start: None }, { end: None }
+    forward, backward = [start], [end]
+
+    def _path(meeting):
+        path = [meeting]
+        while prevs[path[-1]] is not None:
+            path.append(prevs[path[-1]])
+        path.reverse()
+        while nexts[path[-1]] is not None:
+            path.append(nexts[path[-1]])
+        return path
+
+    while forward and backward:
+        # Expand the smaller frontier by one level
+        if len(forward) <= len(backward):
+            frontier, forward = forward, []
+            for node in frontier:
+                for neighbour in successors(node):
+                    if neighbour not in prevs:
+                        prevs[neighbour] = node
+                        if neighbour in nexts:
+                            return _path(neighbour)
+                        forward.append(neighbour)
+        else:
+            frontier, backward = backward, []
+            for node in frontier:
+                for neighbour in predecessors(node):
+                    if neighbour not in nexts:
+                        nexts[neighbour] = node
+                        if neighbour in prevs:
+                            return _path(neighbour)
+                        backward.append(neighbour)
+    return None
+
+
+def shortest_paths(start, targets, successors):
+    '''
+    Breadth-first search for the shortest paths from start to all the targets
+    in a single sweep. Returns dict target -> list of consecutive nodes (or 
+    None when target is unreachable).
+    '''
+    remaining = set(targets)
+    prevs = { start: None }
+    level = [start]
+    remaining.discard(start)
+
+    while level and remaining:
+        frontier, level = level, []
+        for node in frontier:
+            for neighbour in successors(node):
+                if neighbour not in prevs:
+                    prevs[neighbour] = node
+                    remaining.discard(neighbour)
+                    level.append(neighbour)
+
+    paths = dict()
+    for target in targets:
+        if target not in prevs:
+            paths[target] = None
+            continue
+        path = [target]
+        while prevs[path[-1]] is not None:
+            path.append(prevs[path[-1]])
+        paths[target] = path[::-1]
+    return paths
@@ -1,5 +1,6 @@
-import itertools
-from queue import PriorityQueue
+import html
+import time
+from datetime import timedelta
 import csv
 
 import requests
@@ -8,12 +9,19 @@ from bs4 import BeautifulSoup
 import crawlengine.util as util
 
 
+# Size of chunks in which bodies of streamed responses are read
+CHUNK_SIZE = 64 * 1024
+
+
 class WebPage:
     '''Representation of webpage.'''
 
+    __slots__ = ("_url", "loaded", "_response")
+
     def __init__(self, url, load_page=True, params=None, **kwargs):
         self._url = util.normalize_url(url)
         self.loaded = False
+        self._response = None
         if load_page:
             self.reload(params=params, **kwargs)
 
@@ -32,42 +40,242 @@ class WebPage:
     def url(self):
         return self._url
 
-    def reload(self, params=None, head_request=False, **kwargs):
-        '''Reload webpage and updates links & emails.'''
+    def reload(self, params=None, head_request=False, session=None, 
+               content_types=None, max_size=None, cache=None, **kwargs):
+        '''
+        Reload webpage and updates links & emails. Uses session (e.g. shared
+        requests.Session) as transport when given. With content_types (e.g.
+        ("text",)) or max_size the response is streamed and its body is read
+        only when Content-Type starts with one of content_types and the body 
+        has no more than max_size bytes, otherwise the download is aborted 
+        and content of the page is empty. With cache (HTTPCache) the page
+        saved in the cache is requested conditionally, see from_cache.
+        '''
+        transport = session or requests
+        entry = self._conditional(cache, kwargs)
         if head_request:
-            self._response = requests.head(self._url, params=params, **kwargs)
+            self._response = transport.head(self._url, params=params, **kwargs)
+        elif content_types or max_size:
+            response = transport.get(self._url, params=params, stream=True, 
+                                     **kwargs)
+            try:
+                chunks = response.iter_content(CHUNK_SIZE) \
+                    if is_acceptable(response.headers, content_types, 
+                                     max_size) else ()
+                response._content = read_limited(chunks, max_size)
+            finally:
+                response.close()
+            self._response = response
+            self.loaded = True
         else:
-            self._response = requests.get(self._url, params=params, **kwargs)
+            self._response = transport.get(self._url, params=params, **kwargs)
             self.loaded = True
+        self._revalidate(entry)
         return self
 
+    async def areload(self, session, params=None, content_types=None, 
+                      max_size=None, cache=None, **kwargs):
+        '''
+        Coroutine version of reload. Session has to provide asynchronous 
+        context manager get (e.g. aiohttp.ClientSession).
+        '''
+        entry = self._conditional(cache, kwargs)
+        start = time.monotonic()
+        async with session.get(self._url, params=params, **kwargs) as response:
+            if not (content_types or max_size):
+                content = await response.read()
+            elif is_acceptable(response.headers, content_types, max_size):
+                chunks, size = list(), 0
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    size += len(chunk)
+                    if max_size and size > max_size:
+                        chunks = list()
+                        break
+                    chunks.append(chunk)
+                content = b"".join(chunks)
+                response.close()
+            else:
+                content = b""
+                response.close()
+        elapsed = timedelta(seconds=time.monotonic() - start)
+        self._response = AsyncResponse(response, content, elapsed)
+        self.loaded = True
+        self._revalidate(entry)
+        return self
+
+    def _conditional(self, cache, kwargs):
+        '''
+        Add validators of the page saved in the cache to headers of the
+        request. Returns CacheEntry or None.
+        '''
+        entry = cache.lookup(self._url) if cache is not None else None
+        if entry:
+            kwargs["headers"] = dict(kwargs.get("headers") or {}, 
+                                     **entry.validators())
+        return entry
+
+    def _revalidate(self, entry):
+        if entry and self._response.status_code == 304:
+            self._response = CachedResponse(self._response, entry)
+
+    @property
+    def from_cache(self):
+        '''
+        True when the page has not been modified since it was saved in the
+        cache. Urls and emails found on the page are available as attributes
+        urls and emails.
+        '''
+        return isinstance(self._response, CachedResponse)
+
+    def release(self):
+        '''
+        Drop content of the page to save memory. Keeps only status code, 
+        content type, size of content and response time.
+        '''
+        if self._response is not None and \
+                not isinstance(self._response, ResponseSummary):
+            self._response = ResponseSummary.from_response(self._response)
+        return self
+
+    @property
+    def released(self):
+        return isinstance(self._response, ResponseSummary)
+
     def __getattr__(self, attr):
         '''Redirects attributes getter to response.'''
-        if hasattr(self, "_response") and hasattr(self._response, attr):
+        if not attr.startswith("_") and hasattr(self._response, attr):
                 return getattr(self._response, attr)
         raise AttributeError("WebPage object has no attribute '%s', "
                              "try to reload the page." % attr)
 
 
+def is_acceptable(headers, content_types=None, max_size=None):
+    '''
+    Test whether body of the response with given headers should be 
+    downloaded: Content-Type starts with one of content_types and 
+    Content-Length (when known) is not bigger than max_size.
+    '''
+    content_type = headers.get("Content-Type", None) or ""
+    if content_types and not content_type.startswith(tuple(content_types)):
+        return False
+    length = headers.get("Content-Length", None)
+    if max_size and length and length.isdigit() and int(length) > max_size:
+        return False
+    return True
+
+
+def read_limited(chunks, max_size=None):
+    '''
+    Join chunks of the body. Returns empty body when it has more than
+    max_size bytes (the rest of the body is not read).
+    '''
+    content, size = list(), 0
+    for chunk in chunks:
+        size += len(chunk)
+        if max_size and size > max_size:
+            return b""
+        content.append(chunk)
+    return b"".join(content)
+
+
+class AsyncResponse:
+    '''Mimics requests.Response for pages loaded with WebPage.areload.'''
+
+    __slots__ = ("url", "status_code", "headers", "encoding", "content",
+                 "elapsed")
+
+    def __init__(self, response, content, elapsed=None):
+        self.url = str(response.url)
+        self.status_code = response.status
+        self.headers = response.headers
+        self.encoding = response.charset or "utf-8"
+        self.content = content
+        self.elapsed = elapsed
+
+
+class CachedResponse:
+    '''Response 304 Not Modified with results of search of cached page.'''
+
+    __slots__ = ("status_code", "headers", "encoding", "content", "elapsed",
+                 "urls", "emails")
+
+    def __init__(self, response, entry):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.encoding = getattr(response, "encoding", None)
+        self.content = b""
+        self.elapsed = getattr(response, "elapsed", None)
+        self.urls = entry.urls
+        self.emails = entry.emails
+
+
+class ResponseSummary:
+    '''What is left of the response after page content has been released.'''
+
+    __slots__ = ("status_code", "content_type", "nbytes", "elapsed")
+
+    def __init__(self, status_code, content_type, nbytes, elapsed=None):
+        self.status_code = status_code
+        self.content_type = content_type
+        self.nbytes = nbytes
+        self.elapsed = elapsed
+
+    @classmethod
+    def from_response(cls, response):
+        return cls(
+            status_code=response.status_code,
+            content_type=response.headers.get("Content-Type", None),
+            nbytes=len(response.content or b""),
+            elapsed=getattr(response, "elapsed", None)
+        )
+
+    @property
+    def headers(self):
+        return {"Content-Type": self.content_type}
+
+
 class WebGraph:
     '''Representation of relation between webpages.'''
     
     def __init__(self):
         self.graph = dict()
         self.pages = set()
+        self._index = dict() # url -> page
+        self._inbound = dict() # page -> pages referring to the page
+        self.aliases = dict() # url -> page with the same content
+
+    def _register(self, page):
+        '''Add page to the graph. Returns page already stored under the url.'''
+        page = self._index.setdefault(page.url, page)
+        self.pages.add(page)
+        return page
 
     def add_relation(self, p1, p2, directed=True):
         '''
         Add relation between pages to graph. Force using keyword parameters 
         to avoid mistakes.
         '''
+        p1, p2 = self._register(p1), self._register(p2)
         self.graph.setdefault(p1, set()).add(p2)
+        self._inbound.setdefault(p2, set()).add(p1)
         if not directed:
             self.graph.setdefault(p2, set()).add(p1)
+            self._inbound.setdefault(p1, set()).add(p2)
         else:
             if p2 not in self.graph: self.graph[p2] = set()
 
-        self.pages.update((p1, p2))
+    def add_alias(self, alias, page):
+        '''
+        Record that alias (page or url) refers to the page, e.g. because it 
+        has the same content. From now on the url of alias resolves to the 
+        page.
+        '''
+        url = alias.url if isinstance(alias, WebPage) \
+                  else util.normalize_url(alias)
+        page = self._register(page)
+        if url != page.url:
+            self.aliases[url] = page
+            self._index[url] = page
 
     def find_nearest_neighbours(self, page, max_dist, with_dist=True):
         ''' 
@@ -77,7 +285,7 @@ class WebGraph:
 
         # Ensure page is a WebPage.
         if not isinstance(page, WebPage):
-            page = self._url2webpage(page)
+            page = self.get_page(page)
 
         # Return None when page does not exist.
         if page not in self:
@@ -120,9 +328,9 @@ class WebGraph:
 
         # Ensure pstart and pend are WebPage-s.
         if not isinstance(pstart, WebPage):
-            pstart = self._url2webpage(pstart)
+            pstart = self.get_page(pstart)
         if not isinstance(pend, WebPage):
-            pend = self._url2webpage(pend)
+            pend = self.get_page(pend)
 
         # Return None when one of the pages does not exist in the graph.
         if not pstart in self or not pend in self:
@@ -133,41 +341,36 @@ class WebGraph:
             return None
 
         # Test whether the pages are directly connected
-        if pend in self.graph[pstart] or pstart in self.graph[pend]:
+        if pend in self.graph[pstart]:
             return (pstart, pend)
 
-        # Implementation of Dijkstra's algorithm
-        not_visited = self.pages
-        dists = { page: len(self)+1 for page in not_visited }
-        dists[pstart] = 0
-        prevs = { page: None for page in not_visited }
-
-        while not_visited:
-            min_dist = min(dists[item] for item in dists if item in not_visited)
-            current = next(p for p in not_visited if dists[p] == min_dist)
-            not_visited -= set((current,))
-        
-            # Shortes path has been found            
-            if current == pend:
-                break
+        path = util.shortest_path(
+            pstart, pend, 
+            successors=lambda page: self.graph.get(page, ()),
+            predecessors=lambda page: self._inbound.get(page, ())
+        )
+        if not path or len(path) < 2:
+            return None
+        return tuple(path)
 
-            current_dist = dists[current]
-            for page in self.graph[current]:
-                alt = current_dist + 1
-                if alt < dists[page]:
-                    dists[page] = alt
-                    prevs[page] = current
-
-        path = list()
-        target = pend
-        while prevs[target]:
-            path.append(target)
-            target = prevs[target]
-        else:
-            if path: path.append(target)
+    def find_paths(self, pstart, targets):
+        '''
+        Searches for the shortest paths from one page to many target pages in
+        a single sweep through the graph. Returns dict target -> tuple of 
+        consequtive pages in the path (or None if there is no path).
+        '''
+        if not isinstance(pstart, WebPage):
+            pstart = self.get_page(pstart)
+        targets = [target if isinstance(target, WebPage) 
+                       else self.get_page(target) for target in targets]
 
-        return tuple(reversed(path)) or None
+        if pstart not in self:
+            return { target: None for target in targets }
 
+        paths = util.shortest_paths(
+            pstart, targets, lambda page: self.graph.get(page, ())
+        )
+        return { target: path and tuple(path) for target, path in paths.items() }
 
     def get_page(self, url, create_new=True):
         '''
@@ -178,17 +381,10 @@ class WebGraph:
             url = url.url
         url = util.normalize_url(url)
 
-        for page in self.pages:
-            if page.url == url:
-                return page
-        else:
-            if create_new:
-                return WebPage(url=url, load_page=False)
-
-        # return self.pages.get(
-        #     WebPage(url, load_page=False), 
-        #     (create_new and WebPage(url=url, load_page=False) or None)
-        # )
+        page = self._index.get(url, None)
+        if page is None and create_new:
+            page = WebPage(url=url, load_page=False)
+        return page
 
     def add_page(self, obj, parent=None):
         '''
@@ -196,7 +392,7 @@ class WebGraph:
         '''
         if not isinstance(obj, WebPage):
             obj = self._url2webpage(obj)
-        self.pages.add(obj)
+        obj = self._register(obj)
         if parent:
             self.add_relation(parent, obj)
         return obj
@@ -205,9 +401,9 @@ class WebGraph:
         return WebPage(url=util.normalize_url(url), load_page=load_page)
 
     def __contains__(self, page):
-        if not isinstance(page, WebPage):
-            page = self._url2webpage(page)
-        return page in self.pages
+        if isinstance(page, WebPage):
+            return page.url in self._index
+        return util.normalize_url(page) in self._index
 
     def __iter__(self):
         return iter(self.pages)
@@ -229,34 +425,76 @@ class WebGraph:
                     writer.writerow((page.url, subpage.url))
 
 
-def find_urls(page, normalize=True):
+# Backends available for extraction of anchors. The "fast" one never builds
+# DOM and finds anchors with regular expression only.
+PARSERS = ("html.parser", "lxml", "html5lib", "fast")
+
+
+def extract(content, encoding="utf-8", normalize=True, parser="html.parser",
+            anchors=False):
     '''
-    Extracts all the URLs found within a page.
+    Extracts all the URLs and emails found within a page content. Content is
+    decoded and parsed only once and both kinds of items are found in a single
+    pass of the regular expression. Returns tuple (urls, emails). With 
+    anchors the tuple has also dict url -> text of anchors linking to url.
     '''
-    content = page.content
-    content = content.decode(getattr(page, "encoding", "utf-8"), 
-                             errors="ignore")
-
-    soup = BeautifulSoup(content, "html.parser")
-    urls = list(set(itertools.chain(
-        util.find_with_re(str(soup), util.RE_URL),
-        filter(
-            lambda item: item and not item.startswith("mailto:"), 
-            util.find_with_bs(soup, "a", "href")
-        ))))
+    if parser not in PARSERS:
+        raise ValueError("unknown parser '%s'" % parser)
+
+    if isinstance(content, bytes):
+        content = content.decode(encoding or "utf-8", errors="ignore")
+
+    if parser == "fast":
+        hrefs = util.find_hrefs_with_re(content)
+        pairs = util.find_anchors_with_re(content) if anchors else ()
+    else:
+        soup = BeautifulSoup(content, parser)
+        hrefs = util.find_with_bs(soup, "a", "href")
+        pairs = util.find_anchors_with_bs(soup) if anchors else ()
+    texts = dict() # url -> text of anchors
+    for href, text in pairs:
+        if href and text:
+            url = util.normalize_url(href) if normalize else href
+            texts[url] = (texts.get(url, "") + " " + text).lstrip()
+    urls = set(filter(
+        lambda item: item and not item.startswith("mailto:"), hrefs
+    ))
+    emails = set()
+
+    for match in util.RE_URL_OR_EMAIL.finditer(html.unescape(content)):
+        url, email = match.group("url", "email")
+        if url:
+            urls.add(url)
+            if "@" in url:
+                emails.update(util.find_with_re(url, util.RE_EMAIL))
+        else:
+            emails.add(email)
+
     if normalize:
-        urls = [util.normalize_url(url) for url in urls]
-    return urls
+        urls = set(util.normalize_url(url) for url in urls)
+    if anchors:
+        return list(urls), list(emails), texts
+    return list(urls), list(emails)
 
 
-def find_emails(page):
+def find_urls_and_emails(page, normalize=True, parser="html.parser"):
     '''
-    Extracts all the emails found within a page.
+    Extracts all the URLs and emails found within a page. Returns tuple 
+    (urls, emails).
+    '''
+    return extract(page.content, getattr(page, "encoding", None), normalize,
+                   parser)
+
+
+def find_urls(page, normalize=True, parser="html.parser"):
+    '''
+    Extracts all the URLs found within a page.
     '''
-    content = page.content
-    content = content.decode(getattr(page, "encoding", "utf-8"), 
-                             errors="ignore")
+    return find_urls_and_emails(page, normalize, parser)[0]
 
-    soup = BeautifulSoup(content, "html.parser")
-    emails = list(set(util.find_with_re(str(soup), util.RE_EMAIL)))
-    return emails
\ No newline at end of file
+
+def find_emails(page, parser="html.parser"):
+    '''
+    Extracts all the emails found within a page.
+    '''
+    return find_urls_and_emails(page, parser=parser)[1]
@@ -1,7 +1,41 @@
 import argparse
+import sys
+import urllib.parse as urlparse
 
-from crawlengine.crawler import SearchManager, save_to_csv, avoid_extensions
-from crawlengine.webpage import WebPage
+from crawlengine.crawler import SearchManager, Seed, avoid_extensions
+from crawlengine.sinks import CSVSink, WebGraphCSVSink, JSONLinesSink
+from crawlengine.webpage import WebPage, WebGraph, PARSERS
+from crawlengine.compactgraph import CompactWebGraph
+from crawlengine.sqlitegraph import SQLiteWebGraph
+from crawlengine.checkpoint import Checkpoint
+from crawlengine.httpcache import HTTPCache
+from crawlengine.dedup import ContentIndex
+from crawlengine.canonical import Canonicalizer, STRIP_PARAMS
+from crawlengine.traps import TrapFilter
+from crawlengine.priority import KeywordScorer
+from crawlengine.budget import Budget
+
+
+def read_seeds(path):
+    '''
+    Read urls of seeds from the file ("-" means stdin), one per line. Empty
+    lines and lines starting with "#" are skipped. Bare domains (e.g. 
+    example.com) get http:// scheme.
+    '''
+    if path == "-":
+        lines = sys.stdin.readlines()
+    else:
+        with open(path) as seedfile:
+            lines = seedfile.readlines()
+    seeds = list()
+    for line in lines:
+        url = line.strip()
+        if not url or url.startswith("#"):
+            continue
+        if not urlparse.urlsplit(url).netloc:
+            url = "http://" + url
+        seeds.append(url)
+    return seeds
 
 
 if __name__ == "__main__":
@@ -9,9 +43,27 @@ if __name__ == "__main__":
         description="Search web pages for email addresses."
     )
     parser.add_argument("url", help="web page address (url) - starting page",
-                        type=str)
+                        type=str, nargs="?")
     parser.add_argument("-w", "--max_workers", type=int, default=1,
         help="maximal number of simultaneous queries/tasks (http requests)")
+    parser.add_argument("-c", "--max_host_connections", type=int, 
+        default=None, help="maximal number of simultaneous queries to one "
+        "host (by default not limited)")
+    parser.add_argument("-r", "--host_rate", type=float, default=None,
+        help="maximal number of queries per second to one host (by default "
+        "not limited)")
+    parser.add_argument("--connect_timeout", type=float, default=10.0,
+        help="seconds to wait for connection to the host")
+    parser.add_argument("--read_timeout", type=float, default=30.0,
+        help="seconds to wait for data from the host")
+    parser.add_argument("--retries", type=int, default=2,
+        help="number of retries of the page after connection errors, "
+        "timeouts and 5xx responses")
+    parser.add_argument("--max_host_failures", type=int, default=None,
+        help="stop visiting the host after this number of failed queries in "
+        "a row")
+    parser.add_argument("--max_size", type=int, default=10 * 1024 * 1024,
+        help="skip pages bigger than this number of bytes")
     parser.add_argument("-d", "--max_depth", type=int, default=0,
         help="maximal distance of traversed web pages from the starting page")
     parser.add_argument("-s", "--skip", help="skip pages with extensions",
@@ -19,46 +71,232 @@ if __name__ == "__main__":
     parser.add_argument("-l", "--domain_limited", default=True, 
         help="limit search within domain of the starting page",
         action="store_true")
+    parser.add_argument("--strip_params", default=(), nargs="*",
+        help="remove also these query parameters from urls (glob patterns); "
+        "tracking and session parameters are always removed")
+    parser.add_argument("--trailing_slash", default=None, 
+        choices=("strip", "add"), help="canonical form of path of urls")
+    parser.add_argument("--max_path_repeats", type=int, default=3,
+        help="skip urls with a path segment repeated more times (0 - no "
+        "limit)")
+    parser.add_argument("--pattern_budget", type=int, default=1000,
+        help="maximal number of urls of the same pattern (host, path with "
+        "numbers replaced and query parameters), 0 - no limit")
+    parser.add_argument("--max_param_values", type=int, default=100,
+        help="maximal number of distinct values of a query parameter of the "
+        "same path (0 - no limit)")
+    parser.add_argument("--priority", action="store_true",
+        help="visit pages likely to list emails (contact, about, team, "
+        "imprint...) first instead of in BFS order")
+    parser.add_argument("--max_emails", type=int, default=None,
+        help="stop the search when this number of emails is found")
+    parser.add_argument("--max_pages_without_emails", type=int, default=None,
+        help="stop the search when this number of pages in a row yields no "
+        "new emails")
+    parser.add_argument("--email_per_domain", action="store_true",
+        help="stop visiting the host when an email is found on it")
+    parser.add_argument("--max_pages", type=int, default=None,
+        help="stop the search after downloading this number of pages")
+    parser.add_argument("--max_bytes", type=int, default=None,
+        help="stop the search after downloading this number of bytes")
+    parser.add_argument("--max_time", type=float, default=None,
+        help="stop the search after this number of seconds")
+    parser.add_argument("--max_host_pages", type=int, default=None,
+        help="download at most this number of pages from one host")
     parser.add_argument("--csv", default=None, help="path to csv file", type=str)
     parser.add_argument("--webgraph", default=None, type=str,
         help="path to csv file to save web graph")
+    parser.add_argument("--jsonl", default=None, type=str,
+        help="path to JSON Lines file to save results of searched pages")
+    parser.add_argument("-e", "--engine", default="thread", 
+        choices=("thread", "async"),
+        help="crawl engine: thread pool or asyncio event loop (needs aiohttp)")
+    parser.add_argument("-p", "--parser", default="html.parser", 
+        choices=PARSERS, help="html parser used to find links; 'fast' uses "
+        "regular expressions only and never builds DOM")
+    parser.add_argument("--parse_workers", type=int, default=None,
+        help="number of processes searching downloaded pages (by default "
+        "pages are searched by the main process)")
+    parser.add_argument("-g", "--graph", default="dict", 
+        choices=("dict", "compact"), help="representation of web graph; "
+        "'compact' keeps relations in arrays of integers (less memory)")
+    parser.add_argument("--db", default=None, type=str,
+        help="path to SQLite database to keep pages, web graph and emails in "
+        "(instead of memory)")
+    parser.add_argument("--bloom", type=float, default=None, 
+        metavar="ERROR_RATE", help="remember discovered urls in Bloom filter "
+        "with such false positive rate (less memory, some pages are skipped)")
+    parser.add_argument("--cache", default=None, type=str,
+        help="path to SQLite database with HTTP cache; pages not modified "
+        "since the previous search are not downloaded nor searched again")
+    parser.add_argument("--cache_size", type=int, default=100000,
+        help="maximal number of pages in the cache")
+    parser.add_argument("--dedup", default=None, choices=("exact", "simhash"),
+        help="search pages with the same content only once; 'simhash' also "
+        "detects nearly identical pages")
+    parser.add_argument("--checkpoint", default=None, type=str,
+        help="directory to save progress of the search in")
+    parser.add_argument("--seeds", default=None, type=str, metavar="FILE",
+        help="search from every url in the file (one per line, '-' for "
+        "stdin) at once; found emails are printed as 'seed;email'")
+    parser.add_argument("--resume", default=None, type=str,
+        help="continue search saved in the checkpoint directory")
     parser.add_argument("--verbose", help="increase output verbosity",
                     action="store_true")
     args = parser.parse_args()
+    if not args.url and not args.resume and not args.seeds:
+        parser.error("the following arguments are required: url")
+    if args.seeds and (args.checkpoint or args.resume):
+        parser.error("--seeds can not be used with --checkpoint/--resume")
 
     print("\nPress CTRL+C to stop the script.\n")
 
-    sm = SearchManager(max_workers=args.max_workers)
+    if args.db:
+        webgraph = SQLiteWebGraph(args.db)
+    elif args.graph == "compact":
+        webgraph = CompactWebGraph()
+    else:
+        webgraph = WebGraph()
+
+    timeout = (args.connect_timeout, args.read_timeout)
+    cache = HTTPCache(args.cache, args.cache_size) if args.cache else None
+    dedup = ContentIndex(near_duplicates=args.dedup == "simhash") \
+                if args.dedup else None
+    canonicalizer = Canonicalizer(
+        strip_params=STRIP_PARAMS + tuple(args.strip_params),
+        trailing_slash=args.trailing_slash
+    )
+    scorer = KeywordScorer() if args.priority else None
+    if args.engine == "async":
+        from crawlengine.asynccrawler import AsyncSearchManager
+        sm = AsyncSearchManager(max_workers=args.max_workers, 
+                                webgraph=webgraph, parser=args.parser, 
+                                parse_workers=args.parse_workers,
+                                release_content=True,
+                                max_host_connections=args.max_host_connections,
+                                host_rate=args.host_rate, timeout=timeout,
+                                retries=args.retries, 
+                                max_host_failures=args.max_host_failures,
+                                max_size=args.max_size, cache=cache,
+                                dedup=dedup, canonicalizer=canonicalizer,
+                                seen_error_rate=args.bloom, scorer=scorer,
+                                max_emails=args.max_emails,
+                                max_pages_without_emails=
+                                    args.max_pages_without_emails,
+                                email_per_domain=args.email_per_domain)
+    else:
+        sm = SearchManager(max_workers=args.max_workers, webgraph=webgraph,
+                           parser=args.parser,
+                           parse_workers=args.parse_workers, 
+                           release_content=True,
+                           max_host_connections=args.max_host_connections,
+                           host_rate=args.host_rate, timeout=timeout,
+                           retries=args.retries, 
+                           max_host_failures=args.max_host_failures,
+                           max_size=args.max_size, cache=cache,
+                           dedup=dedup, canonicalizer=canonicalizer,
+                           seen_error_rate=args.bloom, scorer=scorer,
+                           max_emails=args.max_emails,
+                           max_pages_without_emails=
+                               args.max_pages_without_emails,
+                           email_per_domain=args.email_per_domain)
 
     if args.verbose:
         def complete(future):
-            print("COMPLETE: %s" % future.result().url)
+            if future.exception():
+                print("FAILED: %r" % future.exception())
+            else:
+                print("COMPLETE: %s" % future.result().url)
         sm.callback = complete
 
     if args.skip:
         sm.add_filter(avoid_extensions(args.skip))
+    traps = TrapFilter(max_path_repeats=args.max_path_repeats or None,
+                       pattern_budget=args.pattern_budget or None,
+                       max_param_values=args.max_param_values or None)
+    sm.add_filter(traps)
 
-    # Run cralwer
-    sm.search(
-        WebPage(args.url), 
-        max_depth=args.max_depth, 
-        within_domain=args.domain_limited
-    )
+    # Results are written while the search is running
+    if args.csv:
+        sm.add_sink(CSVSink(args.csv))
+    if args.webgraph:
+        sm.add_sink(WebGraphCSVSink(args.webgraph))
+    if args.jsonl:
+        sm.add_sink(JSONLinesSink(args.jsonl))
 
-    if args.verbose:
-        print("\nEmails:")
-        if sm.emails:
-            for email in sm.emails:
-                print("\t%s" % email)
+    budget = Budget(max_pages=args.max_pages, max_bytes=args.max_bytes,
+                    max_time=args.max_time, 
+                    max_host_pages=args.max_host_pages)
+
+    # Output is closed also when the search fails or is interrupted again
+    try:
+        # Run cralwer
+        if args.resume:
+            sm.resume(Checkpoint(args.resume), budget=budget)
+        elif args.seeds:
+            seeds = [Seed(url, args.max_depth, args.domain_limited) 
+                         for url in read_seeds(args.seeds)]
+            printed = set()
+            for seed, result in sm.iter_search_many(seeds, budget=budget):
+                for email in result.emails:
+                    if (seed, email) not in printed:
+                        printed.add((seed, email))
+                        print("%s;%s" % (seed.url, email), flush=True)
         else:
-            print("-no emails found")
+            if args.checkpoint:
+                sm.checkpoint = Checkpoint(args.checkpoint)
+            sm.search(
+                WebPage(args.url, load_page=False), 
+                max_depth=args.max_depth, 
+                within_domain=args.domain_limited,
+                budget=budget
+            )
 
-        print("\nVisited web pages:")
-        for page in sm.visited:
-            print("\t%s" % page.url)
+        if sm.stopped:
+            print("\nSearch stopped early: %s" % sm.stopped)
+        print("\nDownloaded %d pages (%d bytes) in %.1f s" % (
+            budget.pages, budget.bytes, budget.elapsed
+        ))
 
-    if args.csv:
-        save_to_csv(args.csv, sm)
+        if traps.rejected:
+            print("\nUrls skipped as crawler traps: %s" % ", ".join(
+                "%s: %d" % item for item in traps.rejected.most_common()
+            ))
 
-    if args.webgraph:
-        sm.webgraph.save_to_csv(args.webgraph)
\ No newline at end of file
+        if dedup is not None:
+            print("\nDuplicated pages: %d of %d (%.1f%%)" % (
+                dedup.duplicates, dedup.checked, 100 * dedup.ratio
+            ))
+
+        if args.verbose:
+            print("\nEmails:")
+            if sm.emails:
+                for email in sm.emails:
+                    print("\t%s" % email)
+            else:
+                print("-no emails found")
+
+            if sm.failed:
+                print("\nFailed web pages:")
+                for page, error in sm.failed.items():
+                    print("\t%s (%s)" % (page.url, error))
+
+            if args.seeds:
+                print("\nSeeds:")
+                for seed in seeds:
+                    print("\t%s (pages: %d, emails: %d)" % (
+                        seed.url, seed.pages, len(seed.emails)
+                    ))
+
+            print("\nVisited web pages:")
+            for page in sm.visited:
+                print("\t%s" % page.url)
+    finally:
+        if sm.checkpoint:
+            sm.checkpoint.close()
+        for sink in sm.sinks:
+            sink.close()
+        if args.db:
+            webgraph.close()
+        if cache is not None:
+            cache.close()
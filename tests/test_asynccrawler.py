@@ -0,0 +1,193 @@
+from unittest.mock import patch
+
+from .website import WebsiteTestCase
+
+from crawlengine.asynccrawler import AsyncSearchManager
+from crawlengine.crawler import Seed
+from crawlengine.webpage import WebPage
+from crawlengine.budget import Budget
+from crawlengine.sinks import CallableSink
+from crawlengine.dedup import ContentIndex
+
+
+class FakeStream:
+
+    def __init__(self, data):
+        self._data = data
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self._data), size):
+            yield self._data[start:start+size]
+
+
+class FakeResponse:
+
+    def __init__(self, response):
+        self.url = response.request.url
+        self.status = response.status_code
+        self.headers = response.headers
+        self.charset = "utf-8"
+        self.content = FakeStream(response.data)
+        self._data = response.data
+
+    async def read(self):
+        return self._data
+
+    def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    '''Imitates aiohttp.ClientSession with flask test client.'''
+
+    def __init__(self, client):
+        self.client = client
+        self.requested = list()
+
+    def get(self, url, params=None, **kwargs):
+        self.requested.append(url)
+        return FakeResponse(self.client.get(url))
+
+
+class InterruptedSession(FakeSession):
+    '''Imitates pressing CTRL+C after max_requests requests.'''
+
+    def __init__(self, client, max_requests):
+        super().__init__(client)
+        self.max_requests = max_requests
+
+    def get(self, url, params=None, **kwargs):
+        if len(self.requested) >= self.max_requests:
+            raise KeyboardInterrupt
+        return super().get(url, params, **kwargs)
+
+
+class ThrottlingSession(FakeSession):
+    '''Answers the first request for every url with 503.'''
+
+    def get(self, url, params=None, **kwargs):
+        response = super().get(url, params, **kwargs)
+        if self.requested.count(url) == 1:
+            response.status = 503
+            response.headers = {"Retry-After": "0"}
+        return response
+
+
+class AsyncSearchManagerTest(WebsiteTestCase):
+
+    def test_max_depth_limits_depth_of_traversed_web_pages(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = AsyncSearchManager(max_workers=5, session=FakeSession(self.client))
+        sm.search(page, max_depth=1)
+        self.assertEqual(len(sm.visited), 11)
+
+    def test_finds_emails_on_visited_pages(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = AsyncSearchManager(max_workers=5, session=FakeSession(self.client))
+        sm.search(page, max_depth=1)
+        self.assertIn("wait@for.it", sm.emails)
+        self.assertIn("bob@test.com", sm.emails)
+
+    def test_each_page_is_downloaded_only_once(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        session = FakeSession(self.client)
+        sm = AsyncSearchManager(max_workers=5, session=session)
+        sm.search(page, max_depth=100)
+        self.assertEqual(len(session.requested), len(set(session.requested)))
+        self.assertEqual(len(session.requested), len(sm.visited))
+
+    def test_iter_search_yields_result_of_every_visited_page(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = AsyncSearchManager(max_workers=5, session=FakeSession(self.client))
+        results = list(sm.iter_search(page, max_depth=1))
+        self.assertEqual(len(results), 11)
+        self.assertIn("bob@test.com", 
+                      set(email for result in results 
+                                for email in result.emails))
+
+    def test_iter_search_stops_crawling_when_consumer_stops(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        session = FakeSession(self.client)
+        sm = AsyncSearchManager(max_workers=2, session=session)
+        results = sm.iter_search(page, max_depth=100)
+        next(results)
+        results.close()
+        self.assertLessEqual(len(session.requested), 1 + 2)
+
+    def test_finishes_running_pages_when_enough_emails_are_found(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        session = FakeSession(self.client)
+        sm = AsyncSearchManager(max_workers=3, session=session, max_emails=2)
+        sm.search(page, max_depth=1)
+        self.assertEqual(sm.stopped, "max emails")
+        self.assertLessEqual(len(session.requested), 1 + 3)
+        self.assertEqual(len(sm.visited), len(session.requested))
+
+    def test_stops_downloading_when_budget_is_used_up(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        session = FakeSession(self.client)
+        sm = AsyncSearchManager(max_workers=5, session=session)
+        sm.search(page, max_depth=1, budget=Budget(max_pages=3))
+        self.assertEqual(len(session.requested), 3)
+        self.assertEqual(len(sm.visited), 3)
+        self.assertEqual(sm.stopped, "max pages")
+
+    def test_searches_many_seeds_with_shared_session(self):
+        bob = Seed("http://localhost:5000/fake/bob", max_depth=1)
+        kate = Seed("http://localhost:5000/fake/kate", max_depth=0)
+        session = FakeSession(self.client)
+        sm = AsyncSearchManager(max_workers=5, session=session)
+        sm.search_many([bob, kate])
+        self.assertEqual(len(session.requested), 4)
+        self.assertEqual((bob.pages, kate.pages), (3, 1))
+        self.assertIn("kate@test.com", kate.emails)
+        self.assertNotIn("kate@test.com", bob.emails)
+
+    def test_requeues_pages_throttled_by_host(self):
+        page = WebPage("http://localhost:5000/fake/bob", load_page=False)
+        session = ThrottlingSession(self.client)
+        sm = AsyncSearchManager(max_workers=5, session=session, retries=1)
+        sm.scheduler.backoff = 0.0
+        sm.search(page, max_depth=0)
+        self.assertEqual(session.requested, [page.url] * 2)
+        self.assertIn(page, sm.visited)
+        self.assertIn("bob@test.com", sm.emails)
+
+    def test_reuses_results_of_duplicated_contents(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = AsyncSearchManager(max_workers=5, session=FakeSession(self.client),
+                                dedup=ContentIndex())
+        sm.search(page, max_depth=1)
+        self.assertGreater(sm.dedup.duplicates, 0)
+        self.assertEqual(len(sm.visited), 11)
+        self.assertIn("kate@test.com", sm.emails)
+
+    def test_keeps_found_results_when_search_is_interrupted(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        results = list()
+        sm = AsyncSearchManager(max_workers=2, 
+                                session=InterruptedSession(self.client, 3),
+                                sinks=[CallableSink(results.append)])
+        sm.search(page, max_depth=1)
+        self.assertGreaterEqual(len(results), 1)
+        self.assertEqual(len(sm.visited), len(results))
+        self.assertIn(page, sm.visited)
+
+    def test_interrupt_before_the_start_ends_search(self):
+        class Interrupted:
+            def __anext__(self):
+                raise KeyboardInterrupt
+            async def aclose(self):
+                pass
+
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = AsyncSearchManager(max_workers=2, session=FakeSession(self.client))
+        with patch.object(sm, "_aiter_run", return_value=Interrupted()):
+            sm.search(page, max_depth=1)
+        self.assertEqual(len(sm.visited), 0)
@@ -0,0 +1,63 @@
+import unittest
+
+from crawlengine.bloom import BloomFilter, ScalableBloomFilter
+
+
+def urls(count, host="www.test.com"):
+    return ["http://%s/page/%d" % (host, i) for i in range(count)]
+
+
+class BloomFilterTest(unittest.TestCase):
+
+    def test_added_items_are_always_found(self):
+        bloom = BloomFilter(1000)
+        for url in urls(1000):
+            bloom.add(url)
+        self.assertTrue(all(url in bloom for url in urls(1000)))
+        self.assertEqual(len(bloom), 1000)
+        self.assertTrue(bloom.full)
+
+    def test_add_returns_false_for_items_added_before(self):
+        bloom = BloomFilter(10)
+        self.assertTrue(bloom.add("http://www.test.com"))
+        self.assertFalse(bloom.add("http://www.test.com"))
+        self.assertEqual(len(bloom), 1)
+
+    def test_false_positive_rate_does_not_exceed_error_rate_much(self):
+        bloom = BloomFilter(10000, error_rate=0.01)
+        for url in urls(10000):
+            bloom.add(url)
+        positives = sum(url in bloom for url in urls(10000, "www.other.com"))
+        self.assertLess(positives / 10000, 0.02)
+
+    def test_uses_less_memory_than_urls(self):
+        bloom = BloomFilter(10000, error_rate=0.001)
+        self.assertLess(bloom.nbytes, 10000 * 2)
+
+    def test_raises_error_for_invalid_error_rate(self):
+        self.assertRaises(ValueError, BloomFilter, 100, 0)
+        self.assertRaises(ValueError, BloomFilter, 100, 1)
+
+
+class ScalableBloomFilterTest(unittest.TestCase):
+
+    def test_grows_when_filter_is_full(self):
+        bloom = ScalableBloomFilter(initial_capacity=100, error_rate=0.01)
+        for url in urls(1000):
+            bloom.add(url)
+        self.assertGreater(len(bloom._filters), 1)
+        self.assertTrue(all(url in bloom for url in urls(1000)))
+
+    def test_false_positive_rate_stays_below_error_rate_after_growing(self):
+        bloom = ScalableBloomFilter(initial_capacity=100, error_rate=0.01)
+        for url in urls(5000):
+            bloom.add(url)
+        positives = sum(url in bloom for url in urls(10000, "www.other.com"))
+        self.assertLess(positives / 10000, 0.02)
+
+    def test_add_returns_false_for_items_in_older_filters(self):
+        bloom = ScalableBloomFilter(initial_capacity=10)
+        bloom.add("http://www.test.com")
+        for url in urls(100):
+            bloom.add(url)
+        self.assertFalse(bloom.add("http://www.test.com"))
@@ -0,0 +1,58 @@
+import unittest
+
+from crawlengine.budget import Budget
+from crawlengine.webpage import WebPage
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def page(url):
+    return WebPage(url, load_page=False)
+
+
+class BudgetTest(unittest.TestCase):
+
+    def test_unlimited_budget_is_never_exhausted(self):
+        budget = Budget()
+        budget.start()
+        for i in range(100):
+            self.assertTrue(budget.charge(page("http://a.com/%d" % i)))
+            budget.received(10**6)
+        self.assertIsNone(budget.exhausted())
+
+    def test_is_exhausted_after_max_pages(self):
+        budget = Budget(max_pages=2)
+        budget.charge(page("http://a.com/1"))
+        self.assertIsNone(budget.exhausted())
+        budget.charge(page("http://b.com/1"))
+        self.assertEqual(budget.exhausted(), "max pages")
+
+    def test_is_exhausted_after_max_bytes(self):
+        budget = Budget(max_bytes=1000)
+        budget.received(600)
+        self.assertIsNone(budget.exhausted())
+        budget.received(600)
+        self.assertEqual(budget.exhausted(), "max bytes")
+
+    def test_is_exhausted_after_max_time(self):
+        clock = FakeClock()
+        budget = Budget(max_time=10, clock=clock)
+        budget.start()
+        clock.now = 9.0
+        self.assertIsNone(budget.exhausted())
+        clock.now = 10.0
+        self.assertEqual(budget.exhausted(), "max time")
+
+    def test_charge_returns_false_when_host_used_up_its_pages(self):
+        budget = Budget(max_host_pages=2)
+        self.assertTrue(budget.charge(page("http://a.com/1")))
+        self.assertTrue(budget.charge(page("http://b.com/1")))
+        self.assertFalse(budget.charge(page("http://a.com/2")))
+        self.assertIsNone(budget.exhausted())
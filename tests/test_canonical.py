@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch
+
+from .website import WebsiteTestCase
+
+from crawlengine.canonical import Canonicalizer
+from crawlengine.crawler import SearchManager
+from crawlengine.webpage import WebPage
+
+
+class CanonicalizerTest(unittest.TestCase):
+
+    def test_normalizes_host_and_port(self):
+        canonical = Canonicalizer()
+        self.assertEqual(canonical("HTTP://Example.COM:80/Path#top"),
+                         "http://example.com/Path")
+
+    def test_strips_tracking_and_session_parameters(self):
+        canonical = Canonicalizer()
+        self.assertEqual(
+            canonical("http://a.com/?utm_source=x&id=3&PHPSESSID=abc&fbclid=1"),
+            "http://a.com/?id=3"
+        )
+        self.assertEqual(canonical("http://a.com/page;jsessionid=A1B2?x=1"),
+                         "http://a.com/page?x=1")
+
+    def test_sorts_query_parameters(self):
+        canonical = Canonicalizer()
+        self.assertEqual(canonical("http://a.com/?b=2&a=1&b=1"),
+                         "http://a.com/?a=1&b=1&b=2")
+        self.assertEqual(Canonicalizer(sort_query=False)("http://a.com/?b=2&a=1"),
+                         "http://a.com/?b=2&a=1")
+
+    def test_keeps_only_parameters_from_keep_params(self):
+        canonical = Canonicalizer(keep_params=["page"])
+        self.assertEqual(canonical("http://a.com/?page=2&sort=asc"),
+                         "http://a.com/?page=2")
+
+    def test_trailing_slash(self):
+        self.assertEqual(Canonicalizer(trailing_slash="strip")("http://a.com/x/"),
+                         "http://a.com/x")
+        self.assertEqual(Canonicalizer(trailing_slash="strip")("http://a.com/"),
+                         "http://a.com/")
+        add = Canonicalizer(trailing_slash="add")
+        self.assertEqual(add("http://a.com/x"), "http://a.com/x/")
+        self.assertEqual(add("http://a.com/x.html"), "http://a.com/x.html")
+
+
+@patch("requests.get")
+@patch("requests.Session.get")
+class CanonicalSearchTest(WebsiteTestCase):
+
+    def test_pages_differing_in_stripped_parameters_are_visited_once(
+            self, *mocks):
+        for mock in mocks:
+            self.mock_requests_get(mock)
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=5, 
+                           canonicalizer=Canonicalizer(keep_params=()))
+        sm.search(page, max_depth=1)
+        self.assertEqual(len(sm.visited), 6)
+        self.assertFalse(any("?" in page.url for page in sm.visited))
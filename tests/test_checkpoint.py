@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from .website import WebsiteTestCase
+
+from crawlengine.checkpoint import Checkpoint
+from crawlengine.crawler import SearchManager
+from crawlengine.webpage import WebPage
+
+
+class CheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "checkpoint")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_load_returns_saved_state(self):
+        checkpoint = Checkpoint(self.path)
+        checkpoint.start("http://localhost:5000/", max_depth=2)
+        checkpoint.seen("http://localhost:5000/", 0)
+        checkpoint.searched("http://localhost:5000/", 
+                            ["http://localhost:5000/test"], ["a@test.com"])
+        checkpoint.seen("http://localhost:5000/test", 1)
+        checkpoint.close()
+
+        state = Checkpoint(self.path).load()
+        self.assertEqual(state.root_url, "http://localhost:5000/")
+        self.assertEqual(state.max_depth, 2)
+        self.assertTrue(state.within_domain)
+        self.assertEqual(state.seen, [("http://localhost:5000/", 0), 
+                                      ("http://localhost:5000/test", 1)])
+        self.assertEqual(state.results, [(
+            "http://localhost:5000/", ["http://localhost:5000/test"], 
+            ["a@test.com"]
+        )])
+
+    def test_records_are_buffered_until_flush(self):
+        checkpoint = Checkpoint(self.path, flush_interval=3600)
+        checkpoint.start("http://localhost:5000/", max_depth=2)
+        checkpoint.seen("http://localhost:5000/", 0)
+        journal = os.path.join(self.path, Checkpoint.JOURNAL)
+        self.assertEqual(os.path.getsize(journal), 0)
+        checkpoint.flush()
+        self.assertGreater(os.path.getsize(journal), 0)
+        checkpoint.close()
+
+    def test_load_skips_line_cut_off_by_crash(self):
+        checkpoint = Checkpoint(self.path)
+        checkpoint.start("http://localhost:5000/", max_depth=2)
+        checkpoint.seen("http://localhost:5000/", 0)
+        checkpoint.close()
+        with open(os.path.join(self.path, Checkpoint.JOURNAL), "a") as journal:
+            journal.write('["S","http://local')
+
+        checkpoint = Checkpoint(self.path)
+        self.assertEqual(len(checkpoint.load().seen), 1)
+        checkpoint.seen("http://localhost:5000/test", 1)
+        checkpoint.close()
+        self.assertEqual(len(Checkpoint(self.path).load().seen), 2)
+
+
+@patch("requests.Session.get")
+class ResumeSearchTest(WebsiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "checkpoint")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def test_resume_of_finished_search_does_not_download_pages(self, get_mock):
+        self.mock_requests_get(get_mock)
+        sm = SearchManager(max_workers=5, checkpoint=Checkpoint(self.path))
+        sm.search(WebPage("http://localhost:5000", load_page=False), 
+                  max_depth=1)
+        sm.checkpoint.close()
+        get_mock.reset_mock()
+
+        resumed = SearchManager(max_workers=5)
+        resumed.resume(Checkpoint(self.path))
+        self.assertFalse(get_mock.called)
+        self.assertEqual(set(resumed.visited), set(sm.visited))
+        self.assertEqual(resumed.emails, sm.emails)
+        self.assertEqual(len(resumed.webgraph), len(sm.webgraph))
+
+    def test_resume_visits_pages_not_searched_before(self, get_mock):
+        self.mock_requests_get(get_mock)
+        checkpoint = Checkpoint(self.path)
+        checkpoint.start("http://localhost:5000/", max_depth=1)
+        checkpoint.seen("http://localhost:5000/", 0)
+        checkpoint.searched("http://localhost:5000/", 
+                            ["http://localhost:5000/fake/bob"], [])
+        checkpoint.seen("http://localhost:5000/fake/bob", 1)
+        checkpoint.close()
+
+        sm = SearchManager(max_workers=5)
+        sm.resume(Checkpoint(self.path))
+        get_mock.assert_called_once_with("http://localhost:5000/fake/bob", 
+                                         params=None, stream=True,
+                                         timeout=sm.timeout)
+        self.assertIn("bob@test.com", sm.emails)
+        self.assertEqual(len(sm.visited), 2)
+
+    def test_resume_visits_links_of_pages_searched_when_interrupted(self, 
+                                                                    get_mock):
+        self.mock_requests_get(get_mock)
+        checkpoint = Checkpoint(self.path)
+        checkpoint.start("http://localhost:5000/", max_depth=1)
+        checkpoint.seen("http://localhost:5000/", 0)
+        checkpoint.searched("http://localhost:5000/", 
+                            ["http://localhost:5000/fake/bob"], [])
+        checkpoint.close()
+
+        sm = SearchManager(max_workers=5)
+        sm.resume(Checkpoint(self.path))
+        sm.checkpoint.close()
+        get_mock.assert_called_once_with("http://localhost:5000/fake/bob", 
+                                         params=None, stream=True,
+                                         timeout=sm.timeout)
+        self.assertIn("bob@test.com", sm.emails)
+        self.assertIn(("http://localhost:5000/fake/bob", 1),
+                      Checkpoint(self.path).load().seen)
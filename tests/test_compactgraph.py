@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+
+from crawlengine.compactgraph import CompactWebGraph
+from crawlengine.webpage import WebPage
+
+
+class CompactWebGraphTest(unittest.TestCase):
+
+    def test_for_adding_relation_between_pages(self):
+        p1 = WebPage("test1", load_page=False)
+        p2 = WebPage("test2", load_page=False)
+        wg = CompactWebGraph()
+        wg.add_relation(p1, p2, directed=False)
+        self.assertIn(p2, wg[p1])
+        self.assertIn(p1, wg[p2])
+
+    def test_duplicated_relations_are_stored_once(self):
+        wg = CompactWebGraph()
+        root = wg.add_page("http://localhost:5000/")
+        for _ in range(3):
+            wg.add_page("http://localhost:5000/test", parent=root)
+        wg.freeze()
+        wg.add_page("http://localhost:5000/test", parent=root)
+        self.assertEqual(len(wg), 2)
+        self.assertEqual(len(wg[root]), 1)
+
+    def test_freeze_merges_new_relations_with_frozen_ones(self):
+        wg = CompactWebGraph()
+        pages = [wg.add_page("http://localhost:5000/%d" % i) 
+                     for i in range(5)]
+        wg.add_relation(pages[0], pages[3])
+        wg.add_relation(pages[2], pages[1])
+        wg.freeze()
+        wg.add_relation(pages[0], pages[1])
+        wg.add_relation(pages[0], pages[3])
+        wg.add_relation(pages[4], pages[0])
+        wg.freeze()
+        self.assertEqual(list(wg._neighbours(0)), [1, 3])
+        self.assertEqual(list(wg._neighbours(2)), [1])
+        self.assertEqual(list(wg._neighbours(4)), [0])
+        self.assertEqual(list(wg._offsets), [0, 2, 2, 3, 3, 4])
+
+    def test_get_page_returns_None_create_new_is_turn_off(self):
+        wg = CompactWebGraph()
+        wg.add_page("http://localhost:5000/test")
+        self.assertIsNone(wg.get_page("http://localhost:5000/", 
+                                      create_new=False))
+        self.assertEqual(wg.get_page("http://localhost:5000/test").url,
+                         "http://localhost:5000/test")
+
+    def test_for_presence_of_page_in_graph(self):
+        wg = CompactWebGraph()
+        p1 = wg.add_page(WebPage("http://localhost:5000/test", load_page=False))
+        p2 = WebPage("http://localhost:5000/home", load_page=False)
+        self.assertTrue("http://localhost:5000/test" in wg)
+        self.assertTrue(p1 in wg)
+        self.assertFalse(p2 in wg)
+
+    def test_alias_resolves_to_page(self):
+        wg = CompactWebGraph()
+        root = wg.add_page("http://localhost:5000/")
+        page = wg.add_page("http://localhost:5000/test", parent=root)
+        wg.add_alias("http://localhost:5000/test?sort=asc", page)
+        wg.add_page("http://localhost:5000/test?sort=asc", parent=root)
+        self.assertEqual(wg.get_page("http://localhost:5000/test?sort=asc"),
+                         page)
+        self.assertEqual(len(wg[root]), 1)
+
+    def test_find_paths_finds_the_shortest_path(self):
+        wg = CompactWebGraph()
+        p = [wg.add_page(WebPage("fake %d" % i, load_page=False)) 
+                 for i in range(5)]
+        wg.add_relation(p[0], p[1], directed=False)
+        wg.add_relation(p[1], p[2], directed=False)
+        wg.add_relation(p[2], p[3], directed=False)
+        wg.add_relation(p[3], p[4], directed=False)
+        wg.add_relation(p[0], p[3], directed=False)
+        self.assertEqual(wg.find_path(p[0], p[4]), (p[0], p[3], p[4]))
+
+    def test_find_path_returns_None_when_no_path(self):
+        wg = CompactWebGraph()
+        p = [wg.add_page(WebPage("fake %d" % i, load_page=False)) 
+                 for i in range(4)]
+        wg.add_relation(p[0], p[1], directed=False)
+        wg.add_relation(p[2], p[3], directed=False)
+        self.assertIsNone(wg.find_path(p[0], p[3]))
+
+    def test_find_path_follows_direction_of_relations(self):
+        wg = CompactWebGraph()
+        p = [wg.add_page(WebPage("fake %d" % i, load_page=False)) 
+                 for i in range(5)]
+        wg.add_relation(p[0], p[1])
+        wg.add_relation(p[1], p[2])
+        wg.add_relation(p[2], p[3])
+        wg.add_relation(p[4], p[3])
+        self.assertEqual(wg.find_path(p[0], p[3]), (p[0], p[1], p[2], p[3]))
+        self.assertIsNone(wg.find_path(p[0], p[4]))
+
+    def test_find_path_does_not_reverse_one_way_relation(self):
+        wg = CompactWebGraph()
+        a, b = [wg.add_page(WebPage("fake %d" % i, load_page=False)) 
+                    for i in range(2)]
+        wg.add_relation(b, a)
+        self.assertIsNone(wg.find_path(a, b))
+        self.assertEqual(wg.find_paths(a, [b]), { b: None })
+        self.assertEqual(wg.find_path(b, a), (b, a))
+
+    def test_find_paths_finds_paths_to_many_pages(self):
+        wg = CompactWebGraph()
+        p = [wg.add_page(WebPage("fake %d" % i, load_page=False)) 
+                 for i in range(5)]
+        wg.add_relation(p[0], p[1])
+        wg.add_relation(p[1], p[2])
+        wg.add_relation(p[0], p[3])
+        paths = wg.find_paths(p[0], [p[2], p[3], p[4], "unknown"])
+        self.assertEqual(paths[p[2]], (p[0], p[1], p[2]))
+        self.assertEqual(paths[p[3]], (p[0], p[3]))
+        self.assertIsNone(paths[p[4]])
+        self.assertIsNone(paths[WebPage("unknown", load_page=False)])
+
+    def test_find_nearest_neighbours_returns_closest_pages(self):
+        wg = CompactWebGraph()
+        p = [wg.add_page(WebPage("fake %d" % i, load_page=False)) 
+                 for i in range(7)]
+        for i, j in ((0, 1), (1, 2), (2, 3), (0, 4), (4, 5), (5, 6), (3, 6)):
+            wg.add_relation(p[i], p[j], directed=False)
+        pages = wg.find_nearest_neighbours(p[0], max_dist=2)
+        self.assertCountEqual(pages, [(p[1], 1), (p[2], 2), (p[4], 1), 
+                                      (p[5], 2)])
+
+    def test_save_to_csv_writes_all_relations(self):
+        wg = CompactWebGraph()
+        root = wg.add_page("http://localhost:5000/")
+        wg.add_page("http://localhost:5000/a", parent=root)
+        wg.add_page("http://localhost:5000/b", parent=root)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "graph.csv")
+            wg.save_to_csv(path)
+            with open(path) as csvfile:
+                lines = csvfile.read().splitlines()
+        self.assertEqual(lines, [
+            "from;to", 
+            "http://localhost:5000/;http://localhost:5000/a",
+            "http://localhost:5000/;http://localhost:5000/b"
+        ])
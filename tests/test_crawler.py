@@ -1,15 +1,25 @@
-from unittest.mock import patch
+import time
+import unittest
+from concurrent import futures
+from unittest.mock import patch, Mock
+
+import requests
 
 from .website import WebsiteTestCase
 
-from crawlengine.crawler import search_webpage, SearchManager
+from crawlengine.crawler import search_webpage, search_content, SearchManager, \
+    Frontier, PriorityFrontier, Seed
 from crawlengine.webpage import WebPage
+from crawlengine.compactgraph import CompactWebGraph
+from crawlengine.bloom import ScalableBloomFilter
+from crawlengine.budget import Budget
 
 
 def patch_requests_get(pass_mock=False):
     def _wrapper(func):
-        def _test_method(self, res_mock):
-            self.mock_requests_get(res_mock)
+        def _test_method(self, res_mock, *other_mocks):
+            for mock in (res_mock,) + other_mocks:
+                self.mock_requests_get(mock)
             if pass_mock:
                 return func(self, res_mock)
             else:
@@ -36,7 +46,80 @@ class SearchWebpageTest(WebsiteTestCase):
         self.assertIn("http://localhost:5000/test", list(result.urls))
 
 
+class SearchContentTest(unittest.TestCase):
+
+    def test_returns_absolute_urls_and_emails(self):
+        urls, emails = search_content(
+            "http://localhost:5000/", "text/html", 
+            b"<a href='/test'>Test</a> admin@test.com"
+        )
+        self.assertEqual(urls, ["http://localhost:5000/test"])
+        self.assertEqual(emails, ["admin@test.com"])
+
+    def test_skips_content_which_is_not_text(self):
+        urls, emails = search_content(
+            "http://localhost:5000/", "image/png", b"admin@test.com"
+        )
+        self.assertFalse(urls)
+        self.assertFalse(emails)
+
+
+class FrontierTest(unittest.TestCase):
+
+    def test_add_ignores_pages_seen_before(self):
+        frontier = Frontier()
+        self.assertTrue(frontier.add(WebPage("test1", load_page=False), 0))
+        self.assertFalse(frontier.add(WebPage("test1", load_page=False), 1))
+        self.assertEqual(len(frontier), 1)
+
+    def test_remembers_depth_of_first_discovery(self):
+        frontier = Frontier()
+        page = WebPage("test1", load_page=False)
+        frontier.add(page, 1)
+        frontier.add(page, 3)
+        frontier.pop()
+        self.assertIn(page, frontier)
+        self.assertEqual(frontier.depth(page), 1)
+
+    def test_pop_returns_pages_in_bfs_order(self):
+        frontier = Frontier()
+        pages = [WebPage("test%d" % i, load_page=False) for i in range(3)]
+        for depth, page in enumerate(pages):
+            frontier.add(page, depth)
+        self.assertEqual([frontier.pop() for _ in range(3)], pages)
+        self.assertFalse(frontier)
+
+    def test_forgets_depth_of_visited_pages(self):
+        frontier = Frontier()
+        page = WebPage("test1", load_page=False)
+        frontier.add(page, 1)
+        frontier.pop()
+        frontier.done(page)
+        self.assertIn(page, frontier)
+        self.assertRaises(KeyError, frontier.depth, page)
+
+    def test_keeps_seen_urls_in_given_set(self):
+        frontier = Frontier(ScalableBloomFilter(100))
+        self.assertTrue(frontier.add(WebPage("test1", load_page=False), 0))
+        self.assertFalse(frontier.add(WebPage("test1", load_page=False), 0))
+        self.assertIn(WebPage("test1", load_page=False), frontier)
+        self.assertNotIn(WebPage("test2", load_page=False), frontier)
+
+
+class PriorityFrontierTest(unittest.TestCase):
+
+    def test_pop_returns_pages_with_highest_score_first(self):
+        frontier = PriorityFrontier()
+        pages = [WebPage("test%d" % i, load_page=False) for i in range(4)]
+        for page, score in zip(pages, (0, 5, 1, 5)):
+            frontier.add(page, 1, score=score)
+        self.assertEqual([frontier.pop() for _ in range(4)], 
+                         [pages[1], pages[3], pages[2], pages[0]])
+        self.assertEqual(frontier.score(pages[1]), 5)
+
+
 @patch("requests.get")
+@patch("requests.Session.get")
 class SearchManagerTest(WebsiteTestCase):
 
     @patch_requests_get()
@@ -51,4 +134,300 @@ class SearchManagerTest(WebsiteTestCase):
         page = WebPage("http://localhost:5000")
         sm = SearchManager(max_workers=5)
         sm.search(page, max_depth=100)
-        self.assertEqual(len(sm.webgraph.graph[page]), 10)
\ No newline at end of file
+        self.assertEqual(len(sm.webgraph.graph[page]), 10)
+
+    @patch_requests_get(True)
+    def test_each_page_is_downloaded_only_once(self, get_mock):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=5)
+        sm.search(page, max_depth=100)
+        urls = [args[0] for args, kwargs in get_mock.call_args_list]
+        self.assertEqual(len(urls), len(set(urls)))
+        self.assertEqual(len(urls), len(sm.visited))
+
+    @patch_requests_get(True)
+    def test_all_workers_share_one_session(self, get_mock):
+        page = WebPage("http://localhost:5000", load_page=False)
+        session = requests.Session()
+        sm = SearchManager(max_workers=5, session=session)
+        sm.search(page, max_depth=1)
+        self.assertIs(sm.session, session)
+        self.assertEqual(get_mock.call_count, len(sm.visited))
+
+    @patch_requests_get()
+    def test_searches_pages_in_pool_of_processes(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=5, parse_workers=2)
+        sm.search(page, max_depth=1)
+        self.assertEqual(len(sm.visited), 11)
+        self.assertIn("bob@test.com", sm.emails)
+
+    @patch_requests_get()
+    def test_releases_content_of_searched_pages(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=5, release_content=True)
+        sm.search(page, max_depth=1)
+        self.assertIn("bob@test.com", sm.emails)
+        self.assertTrue(all(page.released for page in sm.visited))
+
+    @patch_requests_get()
+    def test_works_with_compact_webgraph(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        webgraph = CompactWebGraph()
+        sm = SearchManager(max_workers=5, webgraph=webgraph)
+        sm.search(page, max_depth=1)
+        self.assertIs(sm.webgraph, webgraph)
+        self.assertGreater(len(webgraph), 11)
+        self.assertEqual(len(sm.visited), 11)
+        self.assertEqual(len(sm.webgraph[page]), 14)
+
+    @patch_requests_get()
+    def test_iter_search_yields_result_of_every_visited_page(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=5)
+        results = list(sm.iter_search(page, max_depth=1))
+        self.assertEqual(len(results), 11)
+        self.assertEqual(set(result.page for result in results), 
+                         set(sm.visited))
+
+    @patch_requests_get(True)
+    def test_iter_search_stops_crawling_when_consumer_stops(self, get_mock):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=2)
+        results = sm.iter_search(page, max_depth=100)
+        next(results)
+        results.close()
+        self.assertLessEqual(get_mock.call_count, 1 + 2)
+
+    @patch_requests_get()
+    def test_limits_requests_to_host(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=5, max_host_connections=1, 
+                           host_rate=1000)
+        sm.search(page, max_depth=1)
+        self.assertEqual(len(sm.visited), 11)
+        self.assertFalse(sm.scheduler)
+
+    @patch_requests_get()
+    def test_waits_for_searches_when_no_page_can_be_downloaded(self):
+        sm = SearchManager(max_workers=2)
+        sm.scheduler.add(WebPage("http://localhost:5000", load_page=False))
+        self.assertEqual(sm._wait_timeout(0, 1), 0)
+        self.assertIsNone(sm._wait_timeout(0, 2))
+        self.assertIsNone(sm._wait_timeout(2, 0))
+
+    @patch_requests_get(True)
+    def test_failed_downloads_do_not_stop_search(self, get_mock):
+        side_effect = get_mock.side_effect
+        def get(url, *args, **kwargs):
+            if url.endswith("/fake/bob"):
+                raise requests.ConnectionError("connection refused")
+            return side_effect(url, *args, **kwargs)
+        get_mock.side_effect = get
+
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=5, retries=2, retry_backoff=0)
+        sm.search(page, max_depth=1)
+        bob = WebPage("http://localhost:5000/fake/bob", load_page=False)
+        self.assertIsInstance(sm.failed[bob], requests.ConnectionError)
+        self.assertNotIn(bob, sm.visited)
+        self.assertEqual(len(sm.visited), 10)
+        urls = [args[0] for args, kwargs in get_mock.call_args_list]
+        self.assertEqual(urls.count(bob.url), 3)
+
+    @patch_requests_get(True)
+    def test_requeues_pages_throttled_by_host(self, get_mock):
+        side_effect = get_mock.side_effect
+        requested = list()
+        def get(url, *args, **kwargs):
+            response = side_effect(url, *args, **kwargs)
+            if url.endswith("/fake/bob"):
+                requested.append(time.monotonic())
+                if len(requested) == 1:
+                    response.status_code = 503
+                    response.headers["Retry-After"] = "0.2"
+            return response
+        get_mock.side_effect = get
+
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=5, retries=2, retry_backoff=0)
+        sm.scheduler.backoff = 0.0
+        sm.search(page, max_depth=1)
+        bob = WebPage("http://localhost:5000/fake/bob", load_page=False)
+        self.assertNotIn(bob, sm.failed)
+        self.assertIn(bob, sm.visited)
+        self.assertIn("bob@test.com", sm.emails)
+        self.assertEqual(len(requested), 2)
+        self.assertGreaterEqual(requested[1] - requested[0], 0.2)
+
+    @patch_requests_get(True)
+    def test_pages_with_invalid_links_do_not_stop_search(self, get_mock):
+        side_effect = get_mock.side_effect
+        def get(url, *args, **kwargs):
+            response = side_effect(url, *args, **kwargs)
+            if url.endswith("/fake/bob"):
+                response._content = b'<a href="http://[foo">Foo</a>'
+            return response
+        get_mock.side_effect = get
+
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=5)
+        sm.search(page, max_depth=1)
+        bob = WebPage("http://localhost:5000/fake/bob", load_page=False)
+        self.assertIsInstance(sm.failed[bob], ValueError)
+        self.assertEqual(len(sm.visited), 10)
+
+    @patch_requests_get(True)
+    def test_stops_visiting_host_failing_repeatedly(self, get_mock):
+        get_mock.side_effect = requests.Timeout("read timeout")
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=1, retries=0, max_host_failures=1)
+        sm.search(page, max_depth=1)
+        self.assertEqual(get_mock.call_count, 1)
+        self.assertIn("localhost:5000", sm.scheduler.evicted)
+
+    @patch_requests_get()
+    def test_remembers_seen_pages_in_bloom_filter(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=5, seen_error_rate=0.001)
+        sm.search(page, max_depth=1)
+        self.assertIsInstance(sm.frontier._seen, ScalableBloomFilter)
+        self.assertEqual(len(sm.visited), 11)
+
+    @patch_requests_get()
+    def test_visits_pages_with_highest_score_first(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=1, 
+                           scorer=lambda link: "bob" in link.page.url)
+        results = list(sm.iter_search(page, max_depth=1))
+        self.assertCountEqual([item.page.url for item in results[1:3]],
+                              ["http://localhost:5000/fake/bob",
+                               "http://localhost:5000/fake/bob?name=bob"])
+        self.assertEqual(len(results), 11)
+
+    @patch_requests_get()
+    def test_passes_anchor_text_to_scorer(self):
+        links = list()
+        def scorer(link):
+            links.append(link)
+            return 0
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=1, scorer=scorer)
+        sm.search(page, max_depth=1)
+        anchors = { link.page.url: link.anchor for link in links }
+        self.assertEqual(anchors["http://localhost:5000/fake/bob"], "bob")
+        self.assertIsNone(anchors["http://localhost:5000/"])
+
+    @patch_requests_get()
+    def test_stops_when_enough_emails_are_found(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=1, max_emails=2)
+        sm.search(page, max_depth=1)
+        self.assertEqual(len(sm.visited), 2)
+        self.assertEqual(len(sm.emails), 2)
+        self.assertEqual(sm.stopped, "max emails")
+
+    @patch_requests_get(True)
+    def test_waits_for_running_pages_after_search_is_stopped(self, get_mock):
+        side_effect = get_mock.side_effect
+        def get(url, *args, **kwargs):
+            time.sleep(0.05)
+            return side_effect(url, *args, **kwargs)
+        get_mock.side_effect = get
+
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=3, max_emails=2, host_rate=100)
+        waits = list()
+        wait_for = futures.wait
+        def wait(fs, timeout=None, **kwargs):
+            if sm.stopped:
+                waits.append(timeout)
+            return wait_for(fs, timeout, **kwargs)
+        with patch("crawlengine.crawler.futures.wait", side_effect=wait):
+            sm.search(page, max_depth=1)
+        self.assertEqual(sm.stopped, "max emails")
+        # only downloads running when the search stopped are waited for
+        self.assertLess(len(waits), 3)
+        self.assertTrue(all(timeout is None for timeout in waits))
+
+    @patch_requests_get()
+    def test_stops_after_pages_without_new_emails(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=1, max_pages_without_emails=1)
+        sm.search(page, max_depth=1)
+        self.assertLess(len(sm.visited), 11)
+        self.assertEqual(sm.stopped, "pages without emails")
+
+    @patch_requests_get()
+    def test_stops_visiting_host_when_email_is_found_on_it(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=1, email_per_domain=True)
+        sm.search(page, max_depth=1)
+        self.assertEqual(len(sm.visited), 1)
+        self.assertIn("localhost:5000", sm.scheduler.closed)
+
+    @patch_requests_get(True)
+    def test_stops_downloading_when_budget_of_pages_is_used_up(self, get_mock):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=3)
+        sm.search(page, max_depth=1, budget=Budget(max_pages=5))
+        self.assertEqual(get_mock.call_count, 5)
+        self.assertEqual(len(sm.visited), 5)
+        self.assertEqual(sm.stopped, "max pages")
+
+    @patch_requests_get()
+    def test_stops_downloading_when_budget_of_bytes_is_used_up(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        budget = Budget(max_bytes=1)
+        sm = SearchManager(max_workers=1)
+        sm.search(page, max_depth=1, budget=budget)
+        self.assertEqual(len(sm.visited), 1)
+        self.assertGreater(budget.bytes, 0)
+        self.assertEqual(sm.stopped, "max bytes")
+
+    @patch_requests_get()
+    def test_does_not_start_search_after_time_is_up(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=1)
+        sm.search(page, max_depth=1, budget=Budget(max_time=0))
+        self.assertEqual(len(sm.visited), 0)
+        self.assertEqual(sm.stopped, "max time")
+
+    @patch_requests_get()
+    def test_limits_pages_downloaded_from_host(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=3)
+        sm.search(page, max_depth=1, budget=Budget(max_host_pages=4))
+        self.assertEqual(len(sm.visited), 4)
+        self.assertIn("localhost:5000", sm.scheduler.closed)
+        self.assertIsNone(sm.stopped)
+
+    @patch_requests_get()
+    def test_searches_many_seeds_with_their_own_depth(self):
+        bob = Seed("http://localhost:5000/fake/bob", max_depth=1)
+        kate = Seed("http://localhost:5000/fake/kate", max_depth=0)
+        sm = SearchManager(max_workers=3)
+        results = list(sm.iter_search_many([bob, kate]))
+        self.assertEqual(len(results), 4)
+        self.assertEqual(bob.pages, 3)
+        self.assertEqual(kate.pages, 1)
+        self.assertIn("bob@test.com", bob.emails)
+        self.assertEqual(kate.emails, {"kate@test.com", "wait@for.it"})
+        for seed, result in results:
+            if seed is kate:
+                self.assertEqual(result.page, kate.page)
+
+    @patch_requests_get()
+    def test_seeds_given_as_urls_share_parameters_of_search(self):
+        urls = ["http://localhost:5000/fake/bob", 
+                "http://localhost:5000/fake/mike"]
+        sm = SearchManager(max_workers=2)
+        results = list(sm.iter_search_many(urls, max_depth=0))
+        self.assertCountEqual([seed.url for seed, _ in results], urls)
+        self.assertIn("mike@test.com", sm.emails)
+
+    @patch_requests_get()
+    def test_checkpoint_supports_only_one_seed(self):
+        sm = SearchManager(checkpoint=Mock())
+        with self.assertRaises(ValueError):
+            sm.search_many(["http://a.com", "http://b.com"])
@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import patch
+
+from .website import WebsiteTestCase
+
+from crawlengine.crawler import SearchManager, SearchResult, search_content
+from crawlengine.dedup import ContentIndex, simhash, hamming
+from crawlengine.webpage import WebPage
+
+
+ARTICLE = b'''
+<html><body><h1>Contact</h1>
+<p>Our office is open from Monday to Friday. Write to us if you have any 
+questions about the products, the delivery or the invoices. We answer all 
+the emails within two working days.</p>
+<p>%s</p>
+</body></html>
+'''
+
+
+class SimHashTest(unittest.TestCase):
+
+    def test_similar_contents_have_similar_hashes(self):
+        a = simhash(ARTICLE % b"Last update: Monday")
+        b = simhash(ARTICLE % b"Last update: Friday")
+        c = simhash(b"<html>Completely different page about sport</html>")
+        self.assertLessEqual(hamming(a, b), 10)
+        self.assertGreater(hamming(a, c), hamming(a, b))
+
+
+class ContentIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.result = SearchResult(WebPage("http://a.com/", load_page=False),
+                                   ["http://a.com/b"], ["a@a.com"])
+
+    def test_finds_result_of_the_same_content(self):
+        index = ContentIndex()
+        index.add(index.fingerprint(b"<html>a</html>"), self.result)
+        self.assertIs(index.find(index.fingerprint(b"<html>a</html>")),
+                      self.result)
+        self.assertIsNone(index.find(index.fingerprint(b"<html>b</html>")))
+        self.assertEqual(index.ratio, 0.5)
+
+    def test_finds_near_duplicates(self):
+        index = ContentIndex(near_duplicates=True, max_distance=10)
+        index.add(index.fingerprint(ARTICLE % b"Monday"), self.result)
+        self.assertIs(index.find(index.fingerprint(ARTICLE % b"Friday")),
+                      self.result)
+
+    def test_exact_index_ignores_near_duplicates(self):
+        index = ContentIndex()
+        index.add(index.fingerprint(ARTICLE % b"Monday"), self.result)
+        self.assertIsNone(index.find(index.fingerprint(ARTICLE % b"Friday")))
+
+
+class KnownResultTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sm = SearchManager(dedup=ContentIndex())
+        self.fingerprint = self.sm.dedup.fingerprint(b"<a href='b'>B</a>")
+        original = WebPage("http://a.com/x/a", load_page=False)
+        self.result = SearchResult(original, ["http://a.com/x/b"], [])
+        self.sm.dedup.add(self.fingerprint, self.result)
+
+    def known_result(self, url):
+        page = WebPage(url, load_page=False)
+        self.sm._fingerprints[page] = self.fingerprint
+        return self.sm._known_result(page)
+
+    def test_copy_in_the_same_directory_reuses_urls(self):
+        result = self.known_result("http://a.com/x/c?sort=asc")
+        self.assertEqual(result.urls, self.result.urls)
+
+    def test_copy_in_other_directory_is_searched(self):
+        self.assertIsNone(self.known_result("http://a.com/y/a"))
+
+
+@patch("requests.get")
+@patch("requests.Session.get")
+class DeduplicatedSearchTest(WebsiteTestCase):
+
+    def test_pages_with_the_same_content_are_searched_once(self, *mocks):
+        for mock in mocks:
+            self.mock_requests_get(mock)
+        page = WebPage("http://localhost:5000", load_page=False)
+        reference = SearchManager(max_workers=1)
+        reference.search(page, max_depth=1)
+
+        sm = SearchManager(max_workers=1, dedup=ContentIndex())
+        with patch("crawlengine.crawler.search_content", 
+                   wraps=search_content) as search_mock:
+            sm.search(page, max_depth=1)
+        self.assertGreater(sm.dedup.duplicates, 0)
+        self.assertEqual(search_mock.call_count, 
+                         len(sm.visited) - sm.dedup.duplicates)
+        self.assertEqual(sm.emails, reference.emails)
+        self.assertTrue(sm.webgraph.aliases)
+
+    def test_near_duplicates_keep_their_emails(self, *mocks):
+        for mock in mocks:
+            self.mock_requests_get(mock)
+        page = WebPage("http://localhost:5000", load_page=False)
+        reference = SearchManager(max_workers=1)
+        reference.search(page, max_depth=2)
+
+        dedup = ContentIndex(near_duplicates=True, max_distance=30)
+        sm = SearchManager(max_workers=1, dedup=dedup)
+        sm.search(page, max_depth=2)
+        self.assertGreater(dedup.duplicates, 0)
+        self.assertEqual(sm.emails, reference.emails)
+        self.assertLess(len(sm.visited), len(reference.visited))
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from .website import WebsiteTestCase
+
+from crawlengine.crawler import SearchManager
+from crawlengine.httpcache import HTTPCache
+from crawlengine.webpage import WebPage
+
+
+class HTTPCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lookup_returns_stored_entry(self):
+        cache = HTTPCache(self.path)
+        cache.store("http://a.com/", {"ETag": '"v1"'}, ["http://a.com/b"],
+                    ["a@a.com"])
+        entry = cache.lookup("http://a.com/")
+        self.assertEqual(entry.urls, ["http://a.com/b"])
+        self.assertEqual(entry.emails, ["a@a.com"])
+        self.assertEqual(entry.validators(), {"If-None-Match": '"v1"'})
+        self.assertIsNone(cache.lookup("http://b.com/"))
+
+    def test_does_not_store_pages_without_validators(self):
+        cache = HTTPCache(self.path)
+        self.assertFalse(cache.store("http://a.com/", {}, [], []))
+        self.assertNotIn("http://a.com/", cache)
+
+    def test_evicts_least_recently_used_pages(self):
+        cache = HTTPCache(self.path, max_entries=2)
+        headers = {"Last-Modified": "Mon, 05 Oct 2020 10:00:00 GMT"}
+        cache.store("http://a.com/", headers, [], [])
+        cache.store("http://b.com/", headers, [], [])
+        cache.lookup("http://a.com/")
+        cache.store("http://c.com/", headers, [], [])
+        self.assertEqual(len(cache), 2)
+        self.assertIn("http://a.com/", cache)
+        self.assertNotIn("http://b.com/", cache)
+
+    def test_lookup_does_not_commit(self):
+        cache = HTTPCache(self.path)
+        cache.store("http://a.com/", {"ETag": '"v1"'}, [], [])
+        changes = cache._conn.total_changes
+        for _ in range(10):
+            cache.lookup("http://a.com/")
+        self.assertEqual(cache._conn.total_changes, changes)
+        cache.close()
+
+    def test_buffered_times_of_use_are_written_on_close(self):
+        cache = HTTPCache(self.path, max_entries=2, batch_size=2)
+        headers = {"ETag": '"v1"'}
+        cache.store("http://a.com/", headers, [], [])
+        cache.store("http://b.com/", headers, [], [])
+        cache.lookup("http://a.com/")
+        cache.close()
+        cache = HTTPCache(self.path, max_entries=2)
+        cache.store("http://c.com/", headers, [], [])
+        self.assertIn("http://a.com/", cache)
+        self.assertNotIn("http://b.com/", cache)
+
+    def test_entries_survive_reopening(self):
+        cache = HTTPCache(self.path)
+        cache.store("http://a.com/", {"ETag": '"v1"'}, [], ["a@a.com"])
+        cache.close()
+        cache = HTTPCache(self.path)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.lookup("http://a.com/").emails, ["a@a.com"])
+
+
+@patch("requests.get")
+@patch("requests.Session.get")
+class CachedSearchTest(WebsiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = HTTPCache(os.path.join(self.tmpdir.name, "cache.db"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def mock_requests_get(self, mock):
+        '''Every page has ETag "v1" and is never modified.'''
+        def requests_get(url, *args, headers=None, **kwargs):
+            if (headers or {}).get("If-None-Match") == '"v1"':
+                response = requests.Response()
+                response.status_code = 304
+                response._content, response._content_consumed = b"", True
+                return response
+            response = self.as_requests_response(url, self.client.get(url))
+            response.headers["ETag"] = '"v1"'
+            return response
+        mock.side_effect = requests_get
+        return mock
+
+    def test_unchanged_pages_are_not_searched_again(self, get_mock, _):
+        self.mock_requests_get(get_mock)
+        page = WebPage("http://localhost:5000", load_page=False)
+        first = SearchManager(max_workers=5, cache=self.cache)
+        first.search(page, max_depth=1)
+
+        second = SearchManager(max_workers=5, cache=self.cache)
+        with patch("crawlengine.crawler.search_content") as search_mock:
+            second.search(page, max_depth=1)
+        self.assertFalse(search_mock.called)
+        self.assertEqual(set(second.visited), set(first.visited))
+        self.assertEqual(second.emails, first.emails)
+        self.assertIn("bob@test.com", second.emails)
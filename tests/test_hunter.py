@@ -0,0 +1,31 @@
+import os
+import tempfile
+import unittest
+
+from hunter import read_seeds
+
+
+class ReadSeedsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "seeds.txt")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read(self, content):
+        with open(self.path, "w") as seedfile:
+            seedfile.write(content)
+        return read_seeds(self.path)
+
+    def test_bare_domains_get_http_scheme(self):
+        seeds = self.read("example.com\nexample.org:8080/contact\n"
+                          "https://example.net/\n")
+        self.assertEqual(seeds, ["http://example.com", 
+                                 "http://example.org:8080/contact",
+                                 "https://example.net/"])
+
+    def test_skips_empty_lines_and_indented_comments(self):
+        seeds = self.read("# companies\n\n  # note\nexample.com\n   \n")
+        self.assertEqual(seeds, ["http://example.com"])
@@ -0,0 +1,42 @@
+import unittest
+
+from crawlengine.priority import KeywordScorer, Link
+from crawlengine.webpage import WebPage
+
+
+def link(url, depth=1, anchor=None, parent_emails=0):
+    page = WebPage(url, load_page=False)
+    return Link(page, None, depth, anchor, parent_emails)
+
+
+class KeywordScorerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scorer = KeywordScorer()
+
+    def test_prefers_urls_with_keywords(self):
+        self.assertGreater(self.scorer(link("http://test.com/contact-us")),
+                           self.scorer(link("http://test.com/products")))
+        self.assertGreater(self.scorer(link("http://test.com/Impressum")),
+                           self.scorer(link("http://test.com/blog/2020")))
+
+    def test_prefers_urls_with_keywords_in_anchor_text(self):
+        self.assertGreater(
+            self.scorer(link("http://test.com/page/1", anchor="Our Team")),
+            self.scorer(link("http://test.com/page/2", anchor="Read more"))
+        )
+
+    def test_prefers_shallow_pages(self):
+        self.assertGreater(self.scorer(link("http://test.com/a", 1)),
+                           self.scorer(link("http://test.com/a", 3)))
+
+    def test_prefers_pages_linked_from_pages_with_emails(self):
+        self.assertGreater(
+            self.scorer(link("http://test.com/a", parent_emails=2)),
+            self.scorer(link("http://test.com/a"))
+        )
+
+    def test_uses_custom_keywords(self):
+        scorer = KeywordScorer(keywords={"careers": 5}, depth_penalty=0)
+        self.assertEqual(scorer(link("http://test.com/careers")), 5)
+        self.assertEqual(scorer(link("http://test.com/contact")), 0)
@@ -0,0 +1,135 @@
+import unittest
+
+from crawlengine.scheduler import HostScheduler
+from crawlengine.webpage import WebPage
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def pages(host, count):
+    return [WebPage("http://%s/%d" % (host, i), load_page=False) 
+                for i in range(count)]
+
+
+class HostSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_interleaves_pages_of_different_hosts(self):
+        scheduler = HostScheduler(clock=self.clock)
+        for page in pages("a.com", 3) + pages("b.com", 3):
+            scheduler.add(page)
+        hosts = [scheduler.host(scheduler.pop()) for _ in range(6)]
+        self.assertEqual(hosts, ["a.com", "b.com"] * 3)
+        self.assertIsNone(scheduler.pop())
+        self.assertFalse(scheduler)
+
+    def test_limits_simultaneous_requests_to_host(self):
+        scheduler = HostScheduler(max_connections=2, clock=self.clock)
+        for page in pages("a.com", 3):
+            scheduler.add(page)
+        first, second = scheduler.pop(), scheduler.pop()
+        self.assertIsNone(scheduler.pop())
+        self.assertIsNone(scheduler.delay())
+        scheduler.done(first, 200)
+        self.assertIsNotNone(scheduler.pop())
+
+    def test_limits_number_of_requests_per_second(self):
+        scheduler = HostScheduler(rate=2, clock=self.clock)
+        for page in pages("a.com", 2) + pages("b.com", 1):
+            scheduler.add(page)
+        scheduler.pop(), scheduler.pop()
+        self.assertIsNone(scheduler.pop())
+        self.assertEqual(scheduler.delay(), 0.5)
+        self.clock.now = 0.5
+        self.assertIsNotNone(scheduler.pop())
+
+    def test_backs_off_host_responding_with_429(self):
+        scheduler = HostScheduler(backoff=1.0, max_delay=3.0, 
+                                  clock=self.clock)
+        for page in pages("a.com", 4):
+            scheduler.add(page)
+        for expected in (1.0, 2.0, 3.0):
+            scheduler.done(scheduler.pop(), 429)
+            self.assertEqual(scheduler.delay(), expected)
+            self.clock.now += expected
+        scheduler.done(scheduler.pop(), 200)
+        scheduler.add(pages("a.com", 1)[0])
+        self.clock.now += 3.0
+        scheduler.pop()
+        scheduler.add(pages("a.com", 1)[0])
+        self.assertEqual(scheduler.delay(), 1.5)
+
+    def test_respects_retry_after(self):
+        scheduler = HostScheduler(clock=self.clock)
+        page, = pages("a.com", 1)
+        scheduler.add(page)
+        scheduler.done(scheduler.pop(), 503, retry_after=120)
+        scheduler.add(page)
+        self.assertEqual(scheduler.delay(), 120)
+
+    def test_evicts_host_failing_repeatedly(self):
+        scheduler = HostScheduler(max_failures=2, clock=self.clock)
+        for page in pages("a.com", 4) + pages("b.com", 1):
+            scheduler.add(page)
+        scheduler.done(scheduler.pop(), failed=True) # a.com
+        scheduler.done(scheduler.pop(), 200)         # b.com
+        scheduler.done(scheduler.pop(), failed=True) # a.com
+        self.assertIn("a.com", scheduler.evicted)
+        self.assertEqual(len(scheduler), 0)
+        self.assertFalse(scheduler.add(pages("a.com", 1)[0]))
+
+    def test_hands_out_pages_of_host_in_order_of_priority(self):
+        scheduler = HostScheduler(clock=self.clock)
+        a0, a1, a2 = pages("a.com", 3)
+        scheduler.add(a0)
+        scheduler.add(a1, priority=5)
+        scheduler.add(a2, priority=5)
+        self.assertEqual([scheduler.pop() for _ in range(3)], [a1, a2, a0])
+
+    def test_closed_host_does_not_accept_pages(self):
+        scheduler = HostScheduler(clock=self.clock)
+        for page in pages("a.com", 2) + pages("b.com", 1):
+            scheduler.add(page)
+        self.assertEqual(scheduler.close("a.com"), pages("a.com", 2))
+        self.assertFalse(scheduler.add(pages("a.com", 1)[0]))
+        self.assertEqual(scheduler.pop(), pages("b.com", 1)[0])
+        self.assertIsNone(scheduler.pop())
+
+    def test_hands_out_pages_of_waiting_hosts_when_they_are_ready(self):
+        scheduler = HostScheduler(clock=self.clock)
+        for page in pages("a.com", 2) + pages("b.com", 2):
+            scheduler.add(page)
+        scheduler.done(scheduler.pop(), 429, retry_after=5) # a.com
+        scheduler.done(scheduler.pop(), 429, retry_after=2) # b.com
+        self.assertIsNone(scheduler.pop())
+        self.assertEqual(scheduler.delay(), 2)
+        self.clock.now = 2
+        self.assertEqual(scheduler.host(scheduler.pop()), "b.com")
+        self.assertEqual(scheduler.delay(), 3)
+        self.clock.now = 5
+        self.assertEqual(scheduler.host(scheduler.pop()), "a.com")
+        self.assertFalse(scheduler)
+
+    def test_keeps_round_robin_order_of_many_hosts(self):
+        scheduler = HostScheduler(rate=1, clock=self.clock)
+        hosts = ["%d.com" % i for i in range(1000)]
+        for host in hosts:
+            for page in pages(host, 2):
+                scheduler.add(page)
+        popped = [scheduler.host(scheduler.pop()) for _ in range(1000)]
+        self.assertEqual(popped, hosts)
+        self.assertIsNone(scheduler.pop())
+        self.assertEqual(scheduler.delay(), 1.0)
+        self.clock.now = 1.0
+        popped = [scheduler.host(scheduler.pop()) for _ in range(1000)]
+        self.assertEqual(popped, hosts)
+        self.assertIsNone(scheduler.delay())
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from .website import WebsiteTestCase
+
+from crawlengine.crawler import SearchManager, SearchResult
+from crawlengine.sinks import CSVSink, WebGraphCSVSink, JSONLinesSink, \
+    CallableSink, Sink
+from crawlengine.webpage import WebPage
+
+
+def read_lines(path):
+    with open(path) as file:
+        return file.read().splitlines()
+
+
+class SinksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.result = SearchResult(
+            page=WebPage("http://localhost:5000/", load_page=False),
+            urls=["http://localhost:5000/test"], emails=["a@test.com"]
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_csv_sink_writes_emails_of_pages(self):
+        with CSVSink(self.path("emails.csv")) as sink:
+            sink.write(self.result)
+        self.assertEqual(read_lines(self.path("emails.csv")), 
+                         ["page;email", "http://localhost:5000/;a@test.com"])
+
+    def test_webgraph_csv_sink_writes_relations(self):
+        with WebGraphCSVSink(self.path("graph.csv")) as sink:
+            sink.write(self.result)
+        self.assertEqual(
+            read_lines(self.path("graph.csv")), 
+            ["from;to", "http://localhost:5000/;http://localhost:5000/test"]
+        )
+
+    def test_json_lines_sink_writes_one_object_per_page(self):
+        with JSONLinesSink(self.path("results.jsonl")) as sink:
+            sink.write(self.result)
+            sink.write(self.result)
+        lines = read_lines(self.path("results.jsonl"))
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0]), {
+            "page": "http://localhost:5000/", 
+            "urls": ["http://localhost:5000/test"], "emails": ["a@test.com"]
+        })
+
+    def test_results_are_written_when_buffer_is_full(self):
+        sink = JSONLinesSink(self.path("results.jsonl"), buffer_size=2, 
+                             flush_interval=3600)
+        sink.write(self.result)
+        self.assertEqual(len(read_lines(self.path("results.jsonl"))), 0)
+        sink.write(self.result)
+        self.assertEqual(len(read_lines(self.path("results.jsonl"))), 2)
+        sink.close()
+
+    def test_callable_sink_calls_function_with_every_result(self):
+        results = list()
+        CallableSink(results.append).write(self.result)
+        self.assertEqual(results, [self.result])
+
+    def test_base_sink_discards_results(self):
+        with Sink(buffer_size=1) as sink:
+            sink.write(self.result)
+        self.assertFalse(sink._buffer)
+
+
+@patch("requests.Session.get")
+class SearchManagerSinksTest(WebsiteTestCase):
+
+    def test_writes_result_of_every_searched_page_to_sinks(self, get_mock):
+        self.mock_requests_get(get_mock)
+        results = list()
+        sm = SearchManager(max_workers=5, sinks=[CallableSink(results.append)])
+        sm.search(WebPage("http://localhost:5000", load_page=False), 
+                  max_depth=1)
+        self.assertEqual(len(results), 11)
+        self.assertCountEqual([result.page for result in results], 
+                              sm.visited)
+        bob = next(result for result in results 
+                       if result.page.url.endswith("/fake/bob"))
+        self.assertCountEqual(bob.emails, ["bob@test.com", "wait@for.it"])
@@ -0,0 +1,142 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from .website import WebsiteTestCase
+
+from crawlengine.crawler import SearchManager, save_to_csv
+from crawlengine.sqlitegraph import SQLiteWebGraph
+from crawlengine.webpage import WebPage
+from crawlengine.dedup import ContentIndex
+
+
+class SQLiteWebGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "crawl.db")
+        self.wg = SQLiteWebGraph(self.path, batch_size=10)
+
+    def tearDown(self):
+        self.wg.close()
+        self.tmpdir.cleanup()
+
+    def test_for_adding_relation_between_pages(self):
+        p1 = WebPage("test1", load_page=False)
+        p2 = WebPage("test2", load_page=False)
+        self.wg.add_relation(p1, p2, directed=False)
+        self.assertIn(p2, self.wg[p1])
+        self.assertIn(p1, self.wg[p2])
+        self.assertEqual(len(self.wg), 2)
+
+    def test_for_presence_of_page_in_graph(self):
+        p1 = self.wg.add_page("http://localhost:5000/test")
+        p2 = WebPage("http://localhost:5000/home", load_page=False)
+        self.assertTrue("http://localhost:5000/test" in self.wg)
+        self.assertTrue(p1 in self.wg)
+        self.assertFalse(p2 in self.wg)
+        self.assertIsNone(self.wg.get_page(p2, create_new=False))
+
+    def test_find_path_finds_the_shortest_path(self):
+        p = [self.wg.add_page(WebPage("fake %d" % i, load_page=False))
+                 for i in range(5)]
+        for i, j in ((0, 1), (1, 2), (2, 3), (3, 4), (0, 3)):
+            self.wg.add_relation(p[i], p[j])
+        self.assertEqual(self.wg.find_path(p[0], p[4]), (p[0], p[3], p[4]))
+        self.assertIsNone(self.wg.find_path(p[4], p[0]))
+        self.assertEqual(self.wg.find_paths(p[0], [p[2]]),
+                         { p[2]: (p[0], p[1], p[2]) })
+
+    def test_find_path_does_not_reverse_one_way_relation(self):
+        a, b = [self.wg.add_page(WebPage("fake %d" % i, load_page=False))
+                    for i in range(2)]
+        self.wg.add_relation(b, a)
+        self.assertIsNone(self.wg.find_path(a, b))
+        self.assertEqual(self.wg.find_paths(a, [b]), { b: None })
+        self.assertEqual(self.wg.find_path(b, a), (b, a))
+
+    def test_keeps_emails_of_visited_pages(self):
+        page = self.wg.add_page("http://localhost:5000/")
+        self.wg.add_emails(page, ["a@test.com", "b@test.com"])
+        self.assertTrue(self.wg.is_visited(page))
+        self.assertEqual(self.wg.emails_of(page), {"a@test.com", "b@test.com"})
+        self.assertEqual(len(self.wg.visited_pages()), 1)
+        with self.assertRaises(KeyError):
+            self.wg.emails_of("http://localhost:5000/test")
+
+    def test_relations_of_alias_belong_to_page(self):
+        root = self.wg.add_page("http://localhost:5000/")
+        page = self.wg.add_page("http://localhost:5000/test", parent=root)
+        self.wg.add_alias("http://localhost:5000/test?sort=asc", page)
+        self.wg.add_page("http://localhost:5000/new", 
+                         parent="http://localhost:5000/test?sort=asc")
+        self.assertEqual(self.wg.aliases, 
+                         { "http://localhost:5000/test?sort=asc": page })
+        self.assertEqual(self.wg[page], 
+                         { WebPage("http://localhost:5000/new", 
+                                   load_page=False) })
+
+    def test_data_is_saved_in_database_file(self):
+        root = self.wg.add_page("http://localhost:5000/")
+        self.wg.add_page("http://localhost:5000/test", parent=root)
+        self.wg.add_emails(root, ["a@test.com"])
+        self.wg.close()
+
+        self.wg = SQLiteWebGraph(self.path)
+        self.assertEqual(len(self.wg), 2)
+        self.assertEqual(self.wg.all_emails(), {"a@test.com"})
+        self.assertEqual(list(self.wg.iter_emails()),
+                         [("http://localhost:5000/", "a@test.com")])
+
+
+@patch("requests.Session.get")
+class SearchManagerWithSQLiteTest(WebsiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.wg = SQLiteWebGraph(os.path.join(self.tmpdir.name, "crawl.db"))
+
+    def tearDown(self):
+        self.wg.close()
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def test_stores_results_in_database(self, get_mock):
+        self.mock_requests_get(get_mock)
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=5, webgraph=self.wg)
+        sm.search(page, max_depth=1)
+        self.assertIs(sm.webgraph, self.wg)
+        self.assertGreater(len(self.wg), 11)
+        self.assertTrue(self.wg.is_visited(page))
+        self.assertIn("bob@test.com", self.wg.all_emails())
+        self.assertEqual(len(sm.visited), 11)
+        self.assertIn(page, sm.visited)
+        self.assertEqual(len(sm.webgraph[page]), 14)
+        self.assertIn("bob@test.com", sm.emails)
+        self.assertEqual(sm[WebPage("http://localhost:5000/fake/bob", 
+                                    load_page=False)], {"bob@test.com", 
+                                                        "wait@for.it"})
+
+    def test_save_to_csv_streams_emails_from_database(self, get_mock):
+        self.mock_requests_get(get_mock)
+        sm = SearchManager(max_workers=5, webgraph=self.wg)
+        sm.search(WebPage("http://localhost:5000", load_page=False), 
+                  max_depth=1)
+        path = os.path.join(self.tmpdir.name, "emails.csv")
+        save_to_csv(path, sm)
+        with open(path) as csvfile:
+            lines = csvfile.read().splitlines()
+        self.assertEqual(lines[0], "page;email")
+        self.assertIn("http://localhost:5000/fake/bob;bob@test.com", lines)
+
+    def test_records_aliases_of_duplicated_pages(self, get_mock):
+        self.mock_requests_get(get_mock)
+        page = WebPage("http://localhost:5000", load_page=False)
+        sm = SearchManager(max_workers=1, webgraph=self.wg, 
+                           dedup=ContentIndex())
+        sm.search(page, max_depth=1)
+        self.assertGreater(sm.dedup.duplicates, 0)
+        self.assertEqual(len(self.wg.aliases), sm.dedup.duplicates)
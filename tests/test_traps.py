@@ -0,0 +1,38 @@
+import unittest
+
+from crawlengine.traps import TrapFilter
+from crawlengine.webpage import WebPage
+
+
+def page(url):
+    return WebPage(url, load_page=False)
+
+
+class TrapFilterTest(unittest.TestCase):
+
+    def test_rejects_repeated_path_segments(self):
+        traps = TrapFilter(max_path_repeats=2)
+        self.assertTrue(traps(page("http://a.com/a/b/a/b")))
+        self.assertFalse(traps(page("http://a.com/a/b/a/b/a/b")))
+        self.assertEqual(traps.rejected["path repetition"], 1)
+
+    def test_limits_number_of_urls_with_the_same_pattern(self):
+        traps = TrapFilter(pattern_budget=12)
+        accepted = [traps(page("http://a.com/cal/2024/%d?view=month" % month))
+                        for month in range(1, 25)]
+        self.assertEqual(sum(accepted), 12)
+        self.assertTrue(traps(page("http://a.com/cal/2024/1?view=day&x=1")))
+
+    def test_limits_number_of_values_of_query_parameter(self):
+        traps = TrapFilter(max_param_values=3, pattern_budget=None)
+        accepted = [traps(page("http://a.com/list?offset=%d" % offset))
+                        for offset in range(5)]
+        self.assertEqual(accepted, [True] * 3 + [False] * 2)
+        self.assertTrue(traps(page("http://a.com/list?offset=1")))
+        self.assertTrue(traps(page("http://a.com/other?offset=10")))
+
+    def test_heuristics_can_be_turned_off(self):
+        traps = TrapFilter(max_path_repeats=None, pattern_budget=None,
+                           max_param_values=None)
+        self.assertTrue(all(traps(page("http://a.com/a/a/a/a?x=%d" % i))
+                                for i in range(2000)))
@@ -74,4 +74,50 @@ class FilterWithReTest(unittest.TestCase):
     def test_returns_empty_iterable_if_no_item_match_pattern(self):
         test_iter = [ "abc", "def", "ghg" ]
         result = list(util.filter_with_re(test_iter, r"^test.*"))
-        self.assertFalse(result)
\ No newline at end of file
+        self.assertFalse(result)
+
+
+class NormalizeUrlTest(unittest.TestCase):
+
+    def test_removes_anchor_and_adds_root_path(self):
+        self.assertEqual(util.normalize_url("http://a.com#top"), 
+                         "http://a.com/")
+
+    def test_lowercases_host_but_not_path(self):
+        self.assertEqual(util.normalize_url("http://WWW.A.com/Path?Q=1"),
+                         "http://www.a.com/Path?Q=1")
+
+    def test_drops_default_port(self):
+        self.assertEqual(util.normalize_url("http://a.com:80/x"), 
+                         "http://a.com/x")
+        self.assertEqual(util.normalize_url("https://a.com:443/x"), 
+                         "https://a.com/x")
+        self.assertEqual(util.normalize_url("https://a.com:80/x"), 
+                         "https://a.com:80/x")
+        self.assertEqual(util.normalize_url("http://[::1]:80/x"), 
+                         "http://[::1]/x")
+
+
+class ShortestPathTest(unittest.TestCase):
+
+    GRAPH = { 1: [2, 5], 2: [3], 3: [4], 4: [], 5: [6], 6: [4], 7: [1] }
+
+    def successors(self, node):
+        return self.GRAPH[node]
+
+    def predecessors(self, node):
+        return [src for src, dsts in self.GRAPH.items() if node in dsts]
+
+    def test_finds_the_shortest_path(self):
+        path = util.shortest_path(7, 4, self.successors, self.predecessors)
+        self.assertEqual(len(path), 5)
+        self.assertEqual((path[0], path[1], path[-1]), (7, 1, 4))
+
+    def test_returns_None_when_no_path(self):
+        self.assertIsNone(
+            util.shortest_path(4, 1, self.successors, self.predecessors)
+        )
+
+    def test_shortest_paths_finds_paths_to_all_targets(self):
+        paths = util.shortest_paths(1, [3, 6, 7], self.successors)
+        self.assertEqual(paths, { 3: [1, 2, 3], 6: [1, 5, 6], 7: None })
@@ -1,7 +1,12 @@
+import io
 import unittest
 from unittest.mock import patch, Mock
 
-from crawlengine.webpage import WebPage, WebGraph, find_urls, find_emails
+import requests
+from bs4 import BeautifulSoup, FeatureNotFound
+
+from crawlengine.webpage import WebPage, WebGraph, find_urls, find_emails, \
+    extract
 
 
 def patch_requests_get(pass_mock=False):
@@ -63,6 +68,33 @@ class TestWebPage(unittest.TestCase):
         self.assertEqual(page.content, b"<html></html>")
         self.assertEqual(page.headers, {"Content-Type": "text/html"})
 
+    @patch_requests_get(True)
+    def test_release_drops_content_but_keeps_summary(self, get_mock):
+        get_mock.return_value.status_code = 200
+        page = WebPage("http://localhost:5000")
+        page.release()
+        self.assertTrue(page.released)
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(page.content_type, "text/html")
+        self.assertEqual(page.nbytes, len(b"<html></html>"))
+        self.assertEqual(page.headers, {"Content-Type": "text/html"})
+        with self.assertRaises(AttributeError):
+            page.content
+
+    @patch_requests_get()
+    def test_webpage_has_no_instance_dict(self):
+        page = WebPage("http://localhost:5000", load_page=False)
+        self.assertFalse(hasattr(page, "__dict__"))
+
+    @patch_requests_get(True)
+    def test_reload_uses_session_as_transport(self, get_mock):
+        session = Mock()
+        page = WebPage("http://localhost:5000", load_page=False)
+        page.reload(session=session)
+        session.get.assert_called_once_with("http://localhost:5000/", 
+                                            params=None)
+        self.assertFalse(get_mock.called)
+
     @patch_requests_get()
     @patch("requests.head")
     def test_reload_only_headers(self, head_mock):
@@ -76,6 +108,58 @@ class TestWebPage(unittest.TestCase):
         self.assertEqual(page.headers, {"Content-Type": "text/html"})
 
 
+class Body(io.BytesIO):
+    '''Remembers number of bytes read before the body was closed.'''
+
+    def close(self):
+        self.nread = self.tell()
+        super().close()
+
+
+def streamed_response(content_type, body, content_length=True):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = content_type
+    if content_length:
+        response.headers["Content-Length"] = str(len(body))
+    response.raw = Body(body)
+    return response
+
+
+class StreamedReloadTest(unittest.TestCase):
+
+    def reload(self, response, **kwargs):
+        session = Mock()
+        session.get.return_value = response
+        page = WebPage("http://localhost:5000", load_page=False)
+        return page.reload(session=session, **kwargs)
+
+    def test_reads_body_of_accepted_content_type(self):
+        response = streamed_response("text/html", b"<html></html>")
+        page = self.reload(response, content_types=("text",))
+        self.assertEqual(page.content, b"<html></html>")
+
+    def test_does_not_download_body_of_other_content_types(self):
+        response = streamed_response("application/pdf", b"%PDF" * 1000)
+        page = self.reload(response, content_types=("text",))
+        self.assertEqual(page.content, b"")
+        self.assertEqual(response.raw.nread, 0)
+        self.assertTrue(page.loaded)
+
+    def test_skips_body_with_too_big_content_length(self):
+        response = streamed_response("text/html", b"x" * 1000)
+        page = self.reload(response, max_size=100)
+        self.assertEqual(page.content, b"")
+        self.assertEqual(response.raw.nread, 0)
+
+    def test_stops_reading_body_bigger_than_max_size(self):
+        response = streamed_response("text/html", b"x" * 10**6, 
+                                     content_length=False)
+        page = self.reload(response, max_size=100)
+        self.assertEqual(page.content, b"")
+        self.assertLess(response.raw.nread, 10**6)
+
+
 @patch("crawlengine.webpage.requests.get")
 class FindEmailsAndUrlsTest(unittest.TestCase):
 
@@ -122,6 +206,44 @@ class FindEmailsAndUrlsTest(unittest.TestCase):
         self.assertCountEqual(emails, ["test@gil.com", "test@one.two"])
 
 
+class ExtractTest(unittest.TestCase):
+
+    def test_finds_urls_and_emails_in_one_call(self):
+        content = b"""
+            <html><body>
+                <a href="http://localhost:5000/test">Test</a>
+                <a href="mailto:test@gil.com">E-Mail</a>
+                See http://www.awesome.com or write to admin&#64;test.com
+            </body></html>
+        """
+        urls, emails = extract(content)
+        self.assertCountEqual(urls, ["http://localhost:5000/test", 
+                                     "http://www.awesome.com/"])
+        self.assertCountEqual(emails, ["test@gil.com", "admin@test.com"])
+
+    def test_finds_emails_embedded_in_urls(self):
+        content = "<p>http://www.test.com/contact/john@test.com</p>"
+        urls, emails = extract(content, normalize=False)
+        self.assertEqual(urls, ["http://www.test.com/contact/john@test.com"])
+        self.assertEqual(emails, ["john@test.com"])
+
+
+class ExtractAnchorsTest(unittest.TestCase):
+
+    CONTENT = b"""
+        <a href="/contact">Contact <b>us</b></a>
+        <a href="/contact#form">form</a>
+        <a href="/about"></a>
+    """
+
+    def test_extracts_anchor_texts_of_urls(self):
+        for parser in ("html.parser", "fast"):
+            urls, emails, anchors = extract(self.CONTENT, parser=parser, 
+                                            anchors=True)
+            self.assertCountEqual(urls, ["/contact", "/about"])
+            self.assertEqual(anchors, {"/contact": "Contact us form"})
+
+
 class WebGraphTest(unittest.TestCase):
      
     def test_for_adding_relation_between_pages(self):
@@ -165,6 +287,25 @@ class WebGraphTest(unittest.TestCase):
         self.assertEqual(wg.get_page("http://localhost:5000/test"), p1)
         self.assertEqual(wg.get_page(p2), p2)
 
+    def test_get_page_returns_instance_stored_in_graph(self):
+        wg = WebGraph()
+        root = WebPage(url="http://localhost:5000/", load_page=False)
+        page = wg.add_page("http://localhost:5000/test", parent=root)
+        self.assertIs(wg.get_page("http://localhost:5000/test"), page)
+        self.assertIs(wg.add_page("http://localhost:5000/test"), page)
+        self.assertIs(wg.get_page("http://localhost:5000"), root)
+
+    def test_alias_resolves_to_page(self):
+        wg = WebGraph()
+        root = WebPage(url="http://localhost:5000/", load_page=False)
+        page = wg.add_page("http://localhost:5000/test", parent=root)
+        wg.add_alias("http://localhost:5000/test?sort=asc", page)
+        self.assertIs(wg.get_page("http://localhost:5000/test?sort=asc"), 
+                      page)
+        self.assertIs(wg.add_page("http://localhost:5000/test?sort=asc"), 
+                      page)
+        self.assertEqual(len(wg), 2)
+
     def test_add_page_adds_new_page(self):
         wg = WebGraph()
         page = wg.add_page(WebPage("http://localhost:5000/test", 
@@ -236,6 +377,46 @@ class WebGraphTest(unittest.TestCase):
         path = wg.find_path(p1, p5)
         self.assertCountEqual(path, (p1, p4, p5))
 
+    def test_find_path_does_not_modify_graph(self):
+        wg = WebGraph()
+        p = [wg.add_page(WebPage("fake %d" % i, load_page=False)) 
+                 for i in range(3)]
+        wg.add_relation(p[0], p[1])
+        wg.add_relation(p[1], p[2])
+        self.assertEqual(wg.find_path(p[0], p[2]), (p[0], p[1], p[2]))
+        self.assertEqual(wg.find_path(p[0], p[2]), (p[0], p[1], p[2]))
+        self.assertEqual(len(wg), 3)
+
+    def test_find_path_follows_direction_of_relations(self):
+        wg = WebGraph()
+        p = [wg.add_page(WebPage("fake %d" % i, load_page=False)) 
+                 for i in range(4)]
+        wg.add_relation(p[0], p[1])
+        wg.add_relation(p[1], p[2])
+        wg.add_relation(p[3], p[2])
+        self.assertIsNone(wg.find_path(p[0], p[3]))
+
+    def test_find_path_does_not_reverse_one_way_relation(self):
+        wg = WebGraph()
+        a, b = [wg.add_page(WebPage("fake %d" % i, load_page=False)) 
+                    for i in range(2)]
+        wg.add_relation(b, a)
+        self.assertIsNone(wg.find_path(a, b))
+        self.assertEqual(wg.find_paths(a, [b]), { b: None })
+        self.assertEqual(wg.find_path(b, a), (b, a))
+
+    def test_find_paths_finds_paths_to_many_pages(self):
+        wg = WebGraph()
+        p = [wg.add_page(WebPage("fake %d" % i, load_page=False)) 
+                 for i in range(5)]
+        wg.add_relation(p[0], p[1])
+        wg.add_relation(p[1], p[2])
+        wg.add_relation(p[0], p[3])
+        paths = wg.find_paths(p[0], [p[2], p[3], p[4]])
+        self.assertEqual(paths, {
+            p[2]: (p[0], p[1], p[2]), p[3]: (p[0], p[3]), p[4]: None
+        })
+
     def test_find_nearest_neighbours_returns_closest_pages(self):
         wg = WebGraph()
         p = [wg.add_page(WebPage("fake %d" % i, load_page=False)) for i in range(7)]
@@ -253,4 +434,70 @@ class WebGraphTest(unittest.TestCase):
         wg.add_relation(p[3], p[6], directed=False)
         pages = wg.find_nearest_neighbours(p[0], max_dist=2)
         pages = [ page for page, dist in pages ]
-        self.assertCountEqual(pages, [p[1], p[2], p[4], p[5]])    
\ No newline at end of file
+        self.assertCountEqual(pages, [p[1], p[2], p[4], p[5]])    
+
+
+def parser_available(parser):
+    try:
+        BeautifulSoup("", parser)
+    except FeatureNotFound:
+        return False
+    return True
+
+
+class ParserBackendsTest(unittest.TestCase):
+    '''
+    Documents differences between parser backends. All of them find the same
+    URLs and emails in well-formed pages, as URLs and emails in text are 
+    always found with regular expressions. They differ only in anchors which
+    a browser would not render:
+        html.parser - reference output (pure Python, slowest)
+        lxml        - same as html.parser, several times faster (C library)
+        html5lib    - same as html.parser, follows browsers' error recovery, 
+                      the slowest one
+        fast        - no DOM, also finds relative links in comments and 
+                      scripts; the cheapest one
+    '''
+
+    PAGE = b"""
+        <html><body>
+            <a href="/home">Home</a>
+            <A HREF='/upper'>Upper</A>
+            <a class=link href=/unquoted>Unquoted</a>
+            <a href="/query?a=1&amp;b=2">Query</a>
+            <a href="mailto:mail@test.com">Mail</a>
+            Write to contact@test.com or see http://www.test.com/about
+            <!-- <a href="/commented">Old</a> -->
+            <script>document.write('<a href="/scripted">');</script>
+        </body></html>
+    """
+
+    EXPECTED_URLS = ["/home", "/upper", "/unquoted", "/query?a=1&b=2",
+                     "http://www.test.com/about"]
+
+    def assert_reference_output(self, parser):
+        urls, emails = extract(self.PAGE, normalize=False, parser=parser)
+        self.assertCountEqual(urls, self.EXPECTED_URLS)
+        self.assertCountEqual(emails, ["mail@test.com", "contact@test.com"])
+
+    def test_html_parser_is_reference_backend(self):
+        self.assert_reference_output("html.parser")
+
+    @unittest.skipUnless(parser_available("lxml"), "lxml not installed")
+    def test_lxml_gives_the_same_output(self):
+        self.assert_reference_output("lxml")
+
+    @unittest.skipUnless(parser_available("html5lib"), "html5lib not installed")
+    def test_html5lib_gives_the_same_output(self):
+        self.assert_reference_output("html5lib")
+
+    def test_fast_finds_also_anchors_in_comments_and_scripts(self):
+        urls, emails = extract(self.PAGE, normalize=False, parser="fast")
+        self.assertCountEqual(
+            urls, self.EXPECTED_URLS + ["/commented", "/scripted"]
+        )
+        self.assertCountEqual(emails, ["mail@test.com", "contact@test.com"])
+
+    def test_raises_error_for_unknown_parser(self):
+        with self.assertRaises(ValueError):
+            extract(self.PAGE, parser="regex")
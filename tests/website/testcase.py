@@ -1,5 +1,8 @@
 import unittest
 
+import requests
+from requests.structures import CaseInsensitiveDict
+
 from .app import create_app
 
 
@@ -28,9 +31,18 @@ class WebsiteTestCase(unittest.TestCase):
         return mock
 
     def mock_requests_get(self, mock):
-        def requests_get(*args, **kwargs):
-            response = self.client.get(*args)
-            response.content = response.data
-            return response
+        def requests_get(url, *args, **kwargs):
+            return self.as_requests_response(url, self.client.get(url))
         mock.side_effect = requests_get
-        return mock
\ No newline at end of file
+        return mock
+
+    @staticmethod
+    def as_requests_response(url, response):
+        '''Convert response of the test client into requests.Response.'''
+        result = requests.Response()
+        result.url = url
+        result.status_code = response.status_code
+        result.headers = CaseInsensitiveDict(response.headers)
+        result._content = response.data
+        result._content_consumed = True
+        return result
\ No newline at end of file